@@ -6,3 +6,11 @@ A collection of utilities for AWS Lambda functions.
 :copyright: © 2019 by Elad Kehat.
 :license: MIT, see LICENSE for more details.
 """
+
+
+def __getattr__(name):
+    # Import lazily, so that importing a single astromech module doesn't import all of `astromech.clients`
+    if name == 'warmup':
+        from astromech.clients import warmup
+        return warmup
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
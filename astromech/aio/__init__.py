@@ -0,0 +1,113 @@
+"""asyncio versions of the astromech functions.
+
+Each submodule mirrors a service module, with coroutines in place of the functions that make requests:
+```python
+from astromech.aio import s3
+
+buf = await s3.get_bytes(bucket, key)
+```
+
+boto3 is blocking, so the coroutines run the original functions on a shared thread pool, and await the result.
+The pool is bounded by the size of the client connection pool (see `astromech.clients.max_pool_connections()`),
+so that no thread ever waits for a connection.
+
+Every coroutine accepts an optional `timeout` keyword argument, in seconds. On timeout, `asyncio.TimeoutError` is
+raised. Cancelling a coroutine, whether directly or by a timeout, cancels the call if it hasn't started yet.
+A call that is already running on a thread can't be interrupted: it runs to completion, and its result is dropped.
+
+Use `gather()` to run many calls concurrently, with a limit on how many run at once.
+"""
+import asyncio
+import concurrent.futures
+import functools
+import threading
+from typing import Any, Awaitable, Callable, List, Optional
+
+from astromech import clients
+
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+"""The thread pool that runs blocking calls, initialized lazily by `executor()`.
+
+Do not use this directly! Instead, use the `executor()` function.
+"""
+
+_lock = threading.Lock()
+
+
+def executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Returns the thread pool that runs the blocking calls, initializing it if necessary."""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=clients.max_pool_connections(), thread_name_prefix='astromech-aio')
+    return _executor
+
+
+def shutdown() -> None:
+    """Shuts down the thread pool, after the calls that are running complete.
+
+    A new pool is created the next time it's needed.
+    """
+    global _executor
+    with _lock:
+        pool, _executor = _executor, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+async def run(func: Callable, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    """Runs a blocking function on the thread pool, and returns its result.
+
+    Args:
+        func: The function to run.
+        args: Positional arguments for the function.
+        timeout: The maximum time to wait for the result, in seconds. Waits indefinitely if None.
+        kwargs: Keyword arguments for the function.
+
+    Returns:
+        The return value of the function.
+
+    Raises:
+        asyncio.TimeoutError if the timeout expires, and any exception raised by the function.
+    """
+    future = asyncio.get_running_loop().run_in_executor(executor(), functools.partial(func, *args, **kwargs))
+    return await asyncio.wait_for(future, timeout)
+
+
+def wrap(func: Callable) -> Callable[..., Awaitable]:
+    """Turns a blocking function into a coroutine function that runs it with `run()`.
+
+    The coroutine function takes the same arguments as `func`, plus an optional `timeout`.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, timeout: Optional[float] = None, **kwargs):
+        return await run(func, *args, timeout=timeout, **kwargs)
+    return wrapper
+
+
+async def gather(*aws: Awaitable, limit: Optional[int] = None, return_exceptions: bool = False) -> List[Any]:
+    """Runs awaitables concurrently, with at most `limit` of them running at any time.
+
+    Code example:
+    ```python
+    buffers = await aio.gather(*(s3.get_bytes(bucket, key) for key in keys), limit=20)
+    ```
+
+    Args:
+        aws: The awaitables, typically coroutines from the astromech.aio modules.
+        limit: The maximum number of awaitables to run at once. Defaults to the size of the thread pool.
+        return_exceptions: Like in `asyncio.gather()`. If False, the first exception is raised right away,
+            and the other awaitables keep running. If True, exceptions are returned in place of results.
+
+    Returns:
+        The results, in the same order as the awaitables.
+    """
+    semaphore = asyncio.Semaphore(limit or clients.max_pool_connections())
+
+    async def bounded(aw):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(bounded(aw) for aw in aws), return_exceptions=return_exceptions)
@@ -0,0 +1,6 @@
+"""Coroutine versions of the `astromech.dynamodb` functions. See `astromech.aio`."""
+from astromech import dynamodb
+from astromech.aio import wrap
+from astromech.dynamodb import client, resource, table  # noqa: F401
+
+exists = wrap(dynamodb.exists)
@@ -0,0 +1,14 @@
+"""Coroutine versions of the `astromech.s3` functions. See `astromech.aio`.
+
+The functions that don't make requests are the same as in `astromech.s3`.
+"""
+from astromech import s3
+from astromech.aio import wrap
+from astromech.s3 import client, default_path, parse_uri, to_uri  # noqa: F401
+
+exists = wrap(s3.exists)
+get_size = wrap(s3.get_size)
+get_bytes = wrap(s3.get_bytes)
+get_tags = wrap(s3.get_tags)
+put_bytes = wrap(s3.put_bytes)
+delete = wrap(s3.delete)
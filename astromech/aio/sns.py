@@ -0,0 +1,16 @@
+"""Coroutine versions of the `astromech.sns` functions. See `astromech.aio`."""
+from typing import Optional
+
+from astromech import sns
+from astromech.aio import run, wrap
+from astromech.sns import client, PublishError  # noqa: F401
+
+publish = wrap(sns.publish)
+publish_to_bus = wrap(sns.publish_to_bus)
+publish_many = wrap(sns.publish_many)
+publish_many_to_bus = wrap(sns.publish_many_to_bus)
+
+
+async def flush(timeout: Optional[float] = None) -> None:
+    """Waits until all the messages queued by background publishing are sent. See `astromech.sns.flush()`."""
+    await run(sns.flush, timeout, timeout=timeout)
@@ -0,0 +1,29 @@
+"""Coroutine versions of the `astromech.sqs` functions. See `astromech.aio`."""
+from typing import Optional
+
+from astromech import sqs
+from astromech.aio import run
+from astromech.sqs import client, Message  # noqa: F401
+
+
+async def parse_event(
+    event: dict, lazy: bool = False, unwrap: bool = False, claim_checks: bool = True, timeout: Optional[float] = None
+) -> list:
+    """Returns the messages from a SQS event, as a list.
+
+    Runs `astromech.sqs.parse_event()` on the thread pool, including fetching any claim-checked payloads.
+    Unlike the original, it doesn't support deleting the payloads: the whole event is parsed before the
+    coroutine returns, so there is no way to tell when each message was processed. Delete them yourself
+    with `astromech.aio.s3.delete()`.
+
+    Args:
+        event: The event from `lambda_handler()`.
+        lazy: See `astromech.sqs.parse_event()`.
+        unwrap: See `astromech.sqs.parse_event()`.
+        claim_checks: See `astromech.sqs.parse_event()`.
+        timeout: See `astromech.aio.run()`.
+
+    Returns:
+        The deserialized message bodies from the event records, or `Message` objects if `lazy` is True.
+    """
+    return await run(lambda: list(sqs.parse_event(event, lazy, unwrap, claim_checks)), timeout=timeout)
@@ -0,0 +1,8 @@
+"""Coroutine versions of the `astromech.ssm` functions. See `astromech.aio`."""
+from astromech import ssm
+from astromech.aio import wrap
+from astromech.ssm import clear_cache, client  # noqa: F401
+
+get_param_value = wrap(ssm.get_param_value)
+prefetch = wrap(ssm.prefetch)
+prefetch_path = wrap(ssm.prefetch_path)
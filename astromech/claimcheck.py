@@ -0,0 +1,138 @@
+"""Claim-check offloading of large message payloads to S3.
+
+SNS and SQS reject messages larger than 256 KB. With claim-check enabled, `sns.publish()` stores payloads that
+exceed a size threshold on S3, and publishes a small message that only carries a pointer to the stored object,
+as the message attribute "claim_check" (see `ATTRIBUTE`). `sqs.parse_event()` recognizes these messages and
+fetches the payloads back from S3.
+
+Since anyone who can publish to a topic or queue can set the attribute, consumers only follow pointers into the
+configured location: the bucket from "CLAIM_CHECK_BUCKET", under "CLAIM_CHECK_KEY_PREFIX". With "CLAIM_CHECK_BUCKET"
+unset, claim-check is disabled on the consuming side as well.
+
+Claim-check is configured using environment variables:
+- "CLAIM_CHECK_BUCKET": The S3 bucket to store payloads in. Offloading is disabled unless this is set.
+- "CLAIM_CHECK_KEY_PREFIX": An optional key prefix for the stored payloads.
+- "CLAIM_CHECK_THRESHOLD": The size, in bytes, above which payloads are offloaded. Defaults to `THRESHOLD`.
+- "CLAIM_CHECK_COMPRESS": Set to "true" to gzip payloads before storing them.
+"""
+import gzip
+import os
+from typing import Optional
+import uuid
+
+from astromech import s3
+
+ATTRIBUTE = 'claim_check'
+"""The name of the message attribute that holds the S3 URI of an offloaded payload."""
+
+THRESHOLD = 240 * 1024
+"""The default offloading threshold, in bytes.
+
+It leaves some headroom under the 256 KB limit for the subject and message attributes.
+"""
+
+
+def enabled() -> bool:
+    """Returns True if claim-check offloading is configured, i.e. "CLAIM_CHECK_BUCKET" is set."""
+    return bool(os.environ.get('CLAIM_CHECK_BUCKET'))
+
+
+def threshold() -> int:
+    """Returns the size, in bytes, above which payloads are offloaded."""
+    return int(os.environ.get('CLAIM_CHECK_THRESHOLD', THRESHOLD))
+
+
+def _key_prefix() -> str:
+    return os.environ.get('CLAIM_CHECK_KEY_PREFIX', '').strip('/')
+
+
+def owns(uri: str) -> bool:
+    """Returns True if an S3 URI points to the location that `store()` writes to.
+
+    That is, the bucket is the one from "CLAIM_CHECK_BUCKET", and the key starts with "CLAIM_CHECK_KEY_PREFIX".
+    Always False if claim-check isn't enabled.
+    """
+    if not enabled():
+        return False
+    try:
+        bucket, key = s3.parse_uri(uri)
+    except ValueError:
+        return False
+    key_prefix = _key_prefix()
+    return bucket == os.environ['CLAIM_CHECK_BUCKET'] and (not key_prefix or key.startswith(f'{key_prefix}/'))
+
+
+def _check(uri: str) -> None:
+    if not owns(uri):
+        raise ValueError(f'Not a claim-check URI: {uri}')
+
+
+def store(message: str) -> str:
+    """Stores a message on S3.
+
+    The object is written to the bucket from "CLAIM_CHECK_BUCKET" under a random key, gzip-compressed
+    if "CLAIM_CHECK_COMPRESS" is "true".
+
+    Args:
+        message: The serialized message.
+
+    Returns:
+        The S3 URI of the stored object.
+    """
+    buf = message.encode('utf-8')
+    key = f'{uuid.uuid4()}.json'
+    if os.environ.get('CLAIM_CHECK_COMPRESS', '').lower() == 'true':
+        buf = gzip.compress(buf)
+        key += '.gz'
+    key_prefix = _key_prefix()
+    if key_prefix:
+        key = f'{key_prefix}/{key}'
+    bucket = os.environ['CLAIM_CHECK_BUCKET']
+    s3.put_bytes(buf, bucket, key)
+    return s3.to_uri(bucket, key)
+
+
+def offload(message: str) -> Optional[str]:
+    """Stores a message on S3 if claim-check is enabled and the message exceeds the threshold.
+
+    Args:
+        message: The serialized message.
+
+    Returns:
+        The S3 URI of the stored object, or None if the message wasn't offloaded.
+    """
+    if not enabled() or len(message.encode('utf-8')) <= threshold():
+        return None
+    return store(message)
+
+
+def fetch(uri: str) -> str:
+    """Fetches a message that was stored by `store()`.
+
+    Args:
+        uri: The S3 URI of the stored object.
+
+    Returns:
+        The serialized message.
+
+    Raises:
+        ValueError: If the URI doesn't point to the claim-check location, see `owns()`.
+    """
+    _check(uri)
+    buf = s3.get_bytes(*s3.parse_uri(uri))
+    if uri.endswith('.gz'):
+        buf = gzip.decompress(buf)
+    return buf.decode('utf-8')
+
+
+def delete(uri: str) -> None:
+    """Deletes a message that was stored by `store()`.
+
+    Args:
+        uri: The S3 URI of the stored object.
+
+    Raises:
+        ValueError: If the URI doesn't point to the claim-check location, see `owns()`.
+    """
+    _check(uri)
+    s3.delete(*s3.parse_uri(uri))
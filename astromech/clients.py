@@ -0,0 +1,278 @@
+"""A shared factory for the boto3 clients and resources that astromech uses.
+
+All the service modules create their clients here, so they share a single boto3 session and the same
+botocore configuration. The defaults are tuned for concurrent use:
+- A connection pool of 50 connections per client, rather than botocore's 10.
+- TCP keepalive on the pooled connections.
+- The "adaptive" retry mode, which also backs off client-side when the service throttles.
+
+Each setting can be changed with an environment variable, or by calling `configure()` before the clients are
+created:
+- "ASTROMECH_MAX_POOL_CONNECTIONS"
+- "ASTROMECH_TCP_KEEPALIVE": "true" or "false".
+- "ASTROMECH_RETRY_MODE": One of "legacy", "standard" or "adaptive".
+- "ASTROMECH_MAX_ATTEMPTS": The maximum number of attempts per request, including the first one.
+
+If the environment variable "LOCALSTACK_[SERVICE]_URL" is present (for example, "LOCALSTACK_S3_URL"),
+uses that as the endpoint_url, instead of the real AWS URL.
+"""
+import concurrent.futures
+import importlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, TYPE_CHECKING
+import weakref
+
+from astromech.logging import logger
+
+if TYPE_CHECKING:
+    import boto3.resources.base
+    import boto3.session
+    import botocore.client
+    import botocore.config
+
+lock = threading.RLock()
+"""Guards the creation of the session and of clients.
+
+The service modules also hold it while they lazily initialize their global clients, so that two threads
+never create the same client twice.
+"""
+
+_session = None
+"""The boto3 session that all clients and resources are created from, initialized lazily by `session()`.
+
+Do not use this directly! Instead, use the `session()` function.
+"""
+
+_settings: Dict[str, Any] = {}
+"""Settings passed to `configure()`. These take precedence over the environment variables."""
+
+_hooks: List[Callable[['botocore.client.BaseClient'], None]] = []
+"""Functions that are called with every client created here. See `on_client_created()`."""
+
+_created: weakref.WeakSet = weakref.WeakSet()
+"""The clients created here, including those of service resources, that are still in use."""
+
+
+def configure(
+    max_pool_connections: Optional[int] = None, tcp_keepalive: Optional[bool] = None,
+    retry_mode: Optional[str] = None, max_attempts: Optional[int] = None
+) -> None:
+    """Overrides the botocore configuration for clients created from now on.
+
+    Clients that were already created keep their configuration. Arguments that are None leave the
+    current setting as it is.
+
+    Args:
+        max_pool_connections: The maximum number of connections to keep in each client's connection pool.
+        tcp_keepalive: Whether to turn on TCP keepalive for the connections.
+        retry_mode: The botocore retry mode: "legacy", "standard" or "adaptive".
+        max_attempts: The maximum number of attempts per request, including the first one.
+    """
+    settings = {
+        'max_pool_connections': max_pool_connections, 'tcp_keepalive': tcp_keepalive, 'retry_mode': retry_mode,
+        'max_attempts': max_attempts}
+    with lock:
+        _settings.update((name, value) for name, value in settings.items() if value is not None)
+
+
+def max_pool_connections() -> int:
+    """Returns the size of the connection pool for new clients."""
+    with lock:
+        if 'max_pool_connections' in _settings:
+            return _settings['max_pool_connections']
+    return int(os.environ.get('ASTROMECH_MAX_POOL_CONNECTIONS', 50))
+
+
+def config() -> 'botocore.config.Config':
+    """Returns the botocore configuration for new clients."""
+    import botocore.config
+    with lock:
+        settings = dict(_settings)
+    tcp_keepalive = settings.get(
+        'tcp_keepalive', os.environ.get('ASTROMECH_TCP_KEEPALIVE', 'true').lower() == 'true')
+    retry_mode = settings.get('retry_mode', os.environ.get('ASTROMECH_RETRY_MODE', 'adaptive'))
+    max_attempts = settings.get('max_attempts', int(os.environ.get('ASTROMECH_MAX_ATTEMPTS', 3)))
+    return botocore.config.Config(
+        max_pool_connections=max_pool_connections(),
+        tcp_keepalive=tcp_keepalive,
+        retries={'mode': retry_mode, 'total_max_attempts': max_attempts})
+
+
+def session() -> 'boto3.session.Session':
+    """Returns the shared boto3 session, initializing it if necessary.
+
+    boto3 is imported here, rather than at the top of the module, so that importing astromech stays cheap.
+    """
+    global _session
+    if _session is None:
+        with lock:
+            if _session is None:
+                import boto3.session
+                _session = boto3.session.Session()
+    return _session
+
+
+def on_client_created(hook: Callable[['botocore.client.BaseClient'], None]) -> None:
+    """Registers a function to be called with every client created here.
+
+    The function is also called right away with each of the existing clients, so it doesn't matter whether
+    it is registered before or after the clients are initialized. For service resources, it is called with the
+    resource's low level client.
+
+    Args:
+        hook: A function that takes a client object, for example to register botocore event handlers on it.
+    """
+    with lock:
+        _hooks.append(hook)
+        existing = list(_created)
+    for client in existing:
+        hook(client)
+
+
+def _track(client: 'botocore.client.BaseClient') -> None:
+    with lock:
+        _created.add(client)
+        hooks = list(_hooks)
+    for hook in hooks:
+        hook(client)
+
+
+def _endpoint_url(service: str) -> Optional[str]:
+    # If endpoint_url is None, botocore constructs the default AWS URL
+    return os.environ.get(f'LOCALSTACK_{service.upper()}_URL')
+
+
+def client(service: str) -> 'botocore.client.BaseClient':
+    """Creates a new client for an AWS service.
+
+    Note that this creates a new client on every call. The service modules call it once, and keep the
+    client in a global variable.
+
+    Args:
+        service: The service name, like "s3".
+
+    Returns:
+        The client object.
+    """
+    with lock:
+        client = session().client(service, endpoint_url=_endpoint_url(service), config=config())
+    _track(client)
+    return client
+
+
+def resource(service: str) -> 'boto3.resources.base.ServiceResource':
+    """Creates a new service resource for an AWS service.
+
+    Like `client()`, this creates a new resource on every call.
+
+    Args:
+        service: The service name, like "dynamodb".
+
+    Returns:
+        The service resource object.
+    """
+    with lock:
+        resource = session().resource(service, endpoint_url=_endpoint_url(service), config=config())
+    _track(resource.meta.client)
+    return resource
+
+
+SERVICES = ('dynamodb', 's3', 'sns', 'sqs', 'ssm')
+"""The services that astromech has modules for."""
+
+
+def _connect(client: 'botocore.client.BaseClient') -> None:
+    """Opens a TCP/TLS connection to the client's endpoint, and puts it in the client's connection pool.
+
+    This relies on botocore and urllib3 internals, so it is strictly best-effort: failures are logged and ignored.
+    """
+    try:
+        http_session = client._endpoint.http_session
+        url = client.meta.endpoint_url
+        manager = http_session._get_connection_manager(url, http_session._proxy_config.proxy_url_for(url))
+        pool = manager.connection_from_url(url)
+        http_session._setup_ssl_cert(pool, url, http_session._verify)
+        conn = pool._get_conn()
+        try:
+            conn.connect()
+        finally:
+            pool._put_conn(conn)
+    except Exception as e:
+        logger.debug('Could not pre-connect to %s: %r', client.meta.endpoint_url, e)
+
+
+def _warmup_service(
+    service: str, connect: bool, ssm_params: Iterable[str], ssm_decrypt: bool, ssm_ttl: float
+) -> Dict[str, float]:
+    module: Any = importlib.import_module(f'astromech.{service}')
+    timings = {}
+    # Clients are created one at a time, so the timer only starts once it's this service's turn
+    with lock:
+        start = time.perf_counter()
+        if service == 'dynamodb':
+            module.resource()
+            if os.environ.get('DYNAMODB_TABLE'):
+                module.table()
+        client = module.client()
+        timings[service] = time.perf_counter() - start
+    if connect:
+        start = time.perf_counter()
+        _connect(client)
+        timings[f'{service}.connect'] = time.perf_counter() - start
+    if service == 'ssm' and ssm_params:
+        start = time.perf_counter()
+        module.prefetch(ssm_params, ssm_decrypt, ssm_ttl)
+        timings['ssm.params'] = time.perf_counter() - start
+    return timings
+
+
+def warmup(
+    services: Iterable[str] = SERVICES, connect: bool = False, ssm_params: Iterable[str] = (),
+    ssm_decrypt: bool = True, ssm_ttl: float = 300
+) -> Dict[str, float]:
+    """Initializes the global clients of astromech's service modules, concurrently.
+
+    Call this at module level in your lambda function, so that it runs in the init phase rather than
+    during the first invocation.
+
+    The services are warmed up on separate threads. Because boto3 sessions are not thread-safe, creating
+    the clients themselves is serialized on `lock`; the network-bound steps overlap:
+    - If `connect` is True, a TCP/TLS connection is opened to each service endpoint ahead of the first request.
+      Note that S3 requests that address a bucket by its virtual host name use a different host, and can't
+      benefit from this.
+    - SSM parameters listed in `ssm_params` are loaded into the `astromech.ssm` parameter cache.
+
+    Args:
+        services: The names of the services to warm up. Defaults to all of `SERVICES`.
+            For "dynamodb", the table is also initialized if the environment variable "DYNAMODB_TABLE" is set.
+        connect: Whether to open connections to the service endpoints.
+        ssm_params: Names of SSM parameters to prefetch. Requires "ssm" to be in `services`.
+        ssm_decrypt: Whether to decrypt the SSM parameters.
+        ssm_ttl: How long, in seconds, to cache the SSM parameters for.
+
+    Returns:
+        The time, in seconds, spent on each step, by step: the service name for creating its client (not
+        including the time spent waiting for the other services' clients to be created),
+        "[service].connect" for opening the connection, "ssm.params" for the parameters, and "total" for the
+        whole warm-up.
+    """
+    services = list(dict.fromkeys(services))
+    unknown = set(services) - set(SERVICES)
+    if unknown:
+        raise ValueError(f'Unknown services: {", ".join(sorted(unknown))}')
+    if ssm_params and 'ssm' not in services:
+        raise ValueError('ssm_params requires "ssm" to be one of the services')
+    start = time.perf_counter()
+    timings: Dict[str, float] = {}
+    if services:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(services)) as executor:
+            futures = [
+                executor.submit(_warmup_service, service, connect, ssm_params, ssm_decrypt, ssm_ttl)
+                for service in services]
+            for future in futures:
+                timings.update(future.result())
+    timings['total'] = time.perf_counter() - start
+    logger.debug('Warm-up timings: %s', timings)
+    return timings
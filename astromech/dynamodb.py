@@ -1,9 +1,12 @@
 import os
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
-import boto3
-import boto3.dynamodb.table
-import botocore
+from astromech import clients, singleflight
+
+if TYPE_CHECKING:
+    import boto3.dynamodb.table
+    import boto3.resources.base
+    import botocore.client
 
 _resource = None
 """A DynamoDb service resource, initialized lazily by `resource()` or `table()`.
@@ -25,7 +28,7 @@ Do not use this directly! Instead, use the `table()` function to get an initiali
 """
 
 
-def resource() -> boto3.resources.base.ServiceResource:
+def resource() -> 'boto3.resources.base.ServiceResource':
     """Returns a DynamoDB service resource.
 
     This function always returns the global resource object, initializing it if necessary.
@@ -36,18 +39,20 @@ def resource() -> boto3.resources.base.ServiceResource:
     instead of the real AWS URL.
     Use this to work with dynamodb-local for example.
 
+    The resource is created by `astromech.clients`, which see for its configuration.
+
     Returns:
         The DynamoDB service resource object.
     """
     global _resource
     if _resource is None:
-        endpoint_url = os.environ.get('LOCALSTACK_DYNAMODB_URL')
-        # If endpoint_url is None, botocore constructs the default AWS URL
-        _resource = boto3.resource('dynamodb', endpoint_url=endpoint_url)
+        with clients.lock:
+            if _resource is None:
+                _resource = clients.resource('dynamodb')
     return _resource
 
 
-def client() -> botocore.client.BaseClient:
+def client() -> 'botocore.client.BaseClient':
     """Returns a low level client to DynamoDB.
 
     This function returns the client used by the global _resource.
@@ -59,7 +64,7 @@ def client() -> botocore.client.BaseClient:
     return resource().meta.client
 
 
-def table(table_name: Optional[str] = None) -> boto3.dynamodb.table.TableResource:
+def table(table_name: Optional[str] = None) -> 'boto3.dynamodb.table.TableResource':
     """Returns a DynamoDB table object.
 
     The table takes its name from the `table_name` argument, or from the environment variable
@@ -89,13 +94,18 @@ def table(table_name: Optional[str] = None) -> boto3.dynamodb.table.TableResourc
                 message = 'astromech.dynamodb requires that the environment variable "DYNAMODB_TABLE" be set!'
                 raise(RuntimeError(message))
             table_name = os.environ['DYNAMODB_TABLE']
-        _table = resource().Table(table_name)
+        with clients.lock:
+            if _table is None:
+                _table = resource().Table(table_name)
     return _table
 
 
+@singleflight.coalesce(lambda key: tuple(sorted(key.items())))
 def exists(key: dict) -> bool:
     """Checks whether an item exists in the DynamoDB table.
 
+    Concurrent calls for the same item are coalesced if `astromech.singleflight` is enabled.
+
     Args:
         key: The primary key of the item to check.
 
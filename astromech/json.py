@@ -0,0 +1,79 @@
+"""JSON deserialization with a pluggable backend.
+
+Decoding uses the standard library `json` module by default. Use `set_backend()` to plug in any other
+`loads`-compatible function, for example the much faster [orjson](https://github.com/ijl/orjson):
+```python
+import orjson
+from astromech import json
+
+json.set_backend(orjson.loads)
+```
+
+Note that orjson doesn't decode everything the same way:
+- Integers beyond 64 bits are decoded as floats, losing precision, rather than as ints.
+- "NaN", "Infinity" and "-Infinity" are not valid JSON to orjson, so `loads_or_raw()` returns them as strings.
+"""
+import json
+from typing import Any, Callable, Union
+
+_loads: Callable[[Union[str, bytes]], Any] = json.loads
+"""The active JSON decoding function.
+
+Do not use this directly! Instead, use `loads()`, or `set_backend()` to replace it.
+"""
+
+_JSON_START = frozenset('{["-0123456789tfnNI')
+"""The characters that a JSON document may start with, after leading whitespace.
+
+This includes "NaN" and "Infinity", which the standard library `json` module accepts.
+"""
+
+
+def set_backend(loads: Callable[[Union[str, bytes]], Any]) -> None:
+    """Sets the function used to decode JSON.
+
+    Args:
+        loads: A function with the same contract as `json.loads()`. It must raise a `ValueError`
+            (or a subclass of it) when its input is not valid JSON.
+    """
+    global _loads
+    _loads = loads
+
+
+def loads(s: Union[str, bytes]) -> Any:
+    """Deserializes a JSON document using the active backend.
+
+    Args:
+        s: The JSON document.
+
+    Returns:
+        The deserialized object.
+
+    Raises:
+        ValueError if the document is not valid JSON.
+    """
+    return _loads(s)
+
+
+def loads_or_raw(s: str) -> Any:
+    """Deserializes a JSON document, or returns it as-is if it isn't JSON.
+
+    Strings that cannot possibly be JSON, judging by their first character, are returned without
+    attempting to decode them at all. This makes plain-text input much cheaper than relying only on
+    the decoder raising an exception.
+
+    Args:
+        s: A string that may or may not be a JSON document.
+
+    Returns:
+        The deserialized object, or `s` itself if it isn't JSON.
+    """
+    head = s[:1]
+    if head.isspace():
+        head = s.lstrip()[:1]
+    if head not in _JSON_START:
+        return s
+    try:
+        return _loads(s)
+    except ValueError:
+        return s
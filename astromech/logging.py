@@ -3,12 +3,130 @@
 The logger level defaults to `logging.INFO`, but can be easily configured for every lambda function
 using the environment variable "LOG_LEVEL" and the string representation of the level (one of
 "DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL").
-For example,
+
+The logger is named "astromech". Its messages propagate to the handlers of the root logger, like the one
+that the Lambda runtime installs, but importing this module leaves the root logger itself untouched.
+
+Pass the message arguments to the logger rather than formatting them yourself, e.g.
+`logger.debug('Read %d bytes from %s', size, uri)`. That way they are only formatted if the level is enabled.
+
+Call `configure()` to write structured JSON logs instead, optionally through a queue so that the log I/O
+happens on a background thread.
 """
+import atexit
+import json
 import logging
 import os
+import queue
+import sys
+import time
+from typing import Any, Optional
 
-logger = logging.getLogger()
+logger = logging.getLogger('astromech')
 """Global logger object."""
 
 logger.setLevel(os.environ.get('LOG_LEVEL', logging.INFO))
+
+_RECORD_ATTRIBUTES = frozenset(logging.makeLogRecord({}).__dict__) | {'message', 'asctime'}
+"""The attributes that every log record has. Any other attribute came from the `extra` argument."""
+
+_listener: Optional['logging.handlers.QueueListener'] = None
+"""The listener that writes queued log records, when `configure()` was called with `use_queue=True`."""
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats log records as single-line JSON objects.
+
+    Every object has the keys "timestamp", "level", "logger" and "message", plus "exception" if there is
+    exception info. Values passed in the `extra` argument of the logging call are added as keys as well.
+    Values that aren't JSON-serializable are converted to strings.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created))
+        entry = {
+            'timestamp': f'{timestamp}.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()}
+        entry.update((name, value) for name, value in record.__dict__.items() if name not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _DeferredQueueHandler(logging.Handler):
+    """A queue handler that leaves formatting to the listener thread.
+
+    The standard `logging.handlers.QueueHandler` formats every record in the calling thread before queueing it.
+    This one only queues the record, so that the caller pays for neither formatting nor I/O.
+    """
+
+    def __init__(self, records: queue.SimpleQueue) -> None:
+        super().__init__()
+        self.records = records
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.put_nowait(record)
+
+
+def configure(structured: bool = True, use_queue: bool = False, stream: Any = None) -> None:
+    """Sets up a handler on the astromech logger.
+
+    Once configured, the logger writes its records through its own handler, and no longer propagates them
+    to the root logger.
+
+    Calling this function again replaces the previous configuration.
+
+    Args:
+        structured: If True, writes records as JSON objects using `JsonFormatter`. Otherwise, uses a plain
+            text format.
+        use_queue: If True, the logger only puts records in a queue, and a `QueueListener` thread formats and
+            writes them. Call `flush()` before the handler returns to make sure everything is written;
+            otherwise, records may be delayed until the next invocation thaws the container.
+            Note that message arguments are formatted on the listener thread, so don't modify objects after
+            passing them to the logger.
+        stream: Where to write the records. Defaults to stdout.
+    """
+    global _listener
+    shutdown()
+    handler: logging.Handler = logging.StreamHandler(stream or sys.stdout)
+    if structured:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+    if use_queue:
+        from logging.handlers import QueueListener  # Only imported when needed, since it takes a while
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = QueueListener(records, handler)
+        _listener.start()
+        handler = _DeferredQueueHandler(records)
+    for existing in list(logger.handlers):
+        logger.removeHandler(existing)
+    logger.addHandler(handler)
+    logger.propagate = False
+
+
+def flush() -> None:
+    """Waits until all the queued log records are written, if `configure()` set up a queue."""
+    if _listener is not None:
+        # QueueListener can't flush, but stopping it writes everything that's queued
+        _listener.stop()
+        _listener.start()
+
+
+def shutdown() -> None:
+    """Writes all the queued log records and stops the listener thread, if `configure()` started one.
+
+    Records logged afterwards stay in the queue until `configure()` is called again. This is called
+    automatically when the interpreter exits.
+    """
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+
+
+atexit.register(shutdown)
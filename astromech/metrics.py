@@ -0,0 +1,241 @@
+"""Per-call metrics for the AWS requests that astromech makes, emitted in CloudWatch Embedded Metric Format.
+
+Once `enable()` is called, every client created by `astromech.clients` records, for each API operation:
+the number of calls and errors, the latency of each call, the bytes sent and received, and the number of retries
+and throttled attempts. The metrics are aggregated in memory, and `flush()` writes them all as a single EMF log
+line to stdout, where the Lambda runtime picks it up. CloudWatch turns the line into metrics, with no API calls.
+
+Code example:
+```python
+from astromech import metrics
+
+metrics.enable()
+
+@metrics.flush_on_return
+def lambda_handler(event, context):
+    ...
+```
+
+Metric names have the form "[service].[Operation].[Metric]", for example "s3.GetObject.Latency".
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, IO, List, Optional, Tuple, TYPE_CHECKING
+
+from astromech import clients
+
+if TYPE_CHECKING:
+    import botocore.client
+
+THROTTLE_CODES = frozenset((
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottledException', 'TooManyRequestsException',
+    'ProvisionedThroughputExceededException', 'TransactionInProgressException', 'RequestLimitExceeded',
+    'BandwidthLimitExceeded', 'LimitExceededException', 'RequestThrottled', 'SlowDown', 'PriorRequestNotComplete',
+    'EC2ThrottledException'))
+"""Error codes that botocore treats as throttling."""
+
+MAX_VALUES = 100
+"""The maximum number of latency values per operation in a single EMF line, as allowed by CloudWatch."""
+
+MAX_METRICS = 100
+"""The maximum number of metrics in a single EMF metric directive, as allowed by CloudWatch."""
+
+_UNITS = {
+    'Calls': 'Count', 'Errors': 'Count', 'Latency': 'Milliseconds', 'RequestBytes': 'Bytes', 'ResponseBytes': 'Bytes',
+    'Retries': 'Count', 'Throttles': 'Count'}
+
+_namespace = 'Astromech'
+"""The CloudWatch namespace of the metrics. Set by `enable()`."""
+
+_enabled = False
+
+_lock = threading.Lock()
+"""Guards `_stats`."""
+
+_stats: Dict[Tuple[str, str], Dict[str, Any]] = {}
+"""The aggregated metrics since the last flush, by (service, operation)."""
+
+
+def _record(service: str, operation: str, **values: float) -> None:
+    with _lock:
+        stats = _stats.get((service, operation))
+        if stats is None:
+            stats = _stats[(service, operation)] = dict.fromkeys(_UNITS, 0)
+            stats['Latency'] = []
+        for name, value in values.items():
+            if name == 'Latency':
+                stats['Latency'].append(value)
+            else:
+                stats[name] += value
+
+
+def _key(model: Any) -> Tuple[str, str]:
+    return (model.service_model.service_name, model.name)
+
+
+def _before_call(model: Any, context: dict, **kwargs: Any) -> None:
+    # The after-call-error event doesn't get the operation model, so it's kept in the context as well
+    context['astromech_metrics_key'] = _key(model)
+    context['astromech_metrics_start'] = time.perf_counter()
+
+
+def _request_bytes(request: Any) -> int:
+    """Returns the size of a request body.
+
+    Streaming bodies, like S3 uploads, aren't read: their size comes from the headers, or else from seeking.
+    """
+    for header in ('Content-Length', 'X-Amz-Decoded-Content-Length'):
+        value = request.headers.get(header)
+        if value:
+            return int(value)
+    body = request.body
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    try:
+        position = body.tell()
+        end = body.seek(0, os.SEEK_END)
+        body.seek(position)
+    except (AttributeError, OSError, ValueError):
+        return 0
+    return end - position
+
+
+def _request_created(request: Any, operation_name: str, **kwargs: Any) -> None:
+    if request.context.get('astromech_metrics_start') is not None:
+        request.context['astromech_metrics_request_bytes'] = (
+            request.context.get('astromech_metrics_request_bytes', 0) + _request_bytes(request))
+
+
+def _response_bytes(http_response: Any, model: Any) -> int:
+    """Returns the size of a response body.
+
+    Bodies that botocore already read are measured as is. The Content-Length header of a HEAD response is the size
+    of the object, not of a body, so that isn't used. Only streaming bodies, like S3 downloads, which are read by
+    the caller later, are taken from the Content-Length header.
+    """
+    if http_response is None or http_response.raw is None:
+        # No response was received, or it was made up, e.g. by botocore's Stubber
+        return 0
+    if model.has_streaming_output and http_response.status_code < 300:
+        return int(http_response.headers.get('Content-Length') or 0)
+    return len(http_response.content or b'')
+
+
+def _needs_retry(operation: Any, request_dict: dict, response: Optional[tuple] = None, **kwargs: Any) -> None:
+    if response is not None and response[1].get('Error', {}).get('Code') in THROTTLE_CODES:
+        context = request_dict.get('context', {})
+        context['astromech_metrics_throttles'] = context.get('astromech_metrics_throttles', 0) + 1
+
+
+def _after_call(http_response: Any, parsed: dict, model: Any, context: dict, **kwargs: Any) -> None:
+    start = context.get('astromech_metrics_start')
+    if start is None:
+        return
+    error_code = parsed.get('Error', {}).get('Code')
+    # The final response was already counted by _needs_retry, which botocore calls after every attempt
+    _record(
+        *_key(model), Calls=1, Errors=1 if error_code else 0, Latency=(time.perf_counter() - start) * 1000,
+        RequestBytes=context.get('astromech_metrics_request_bytes', 0),
+        ResponseBytes=_response_bytes(http_response, model),
+        Retries=parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0),
+        Throttles=context.get('astromech_metrics_throttles', 0))
+
+
+def _after_call_error(exception: Exception, context: dict, **kwargs: Any) -> None:
+    # Emitted instead of after-call when there was no response at all, e.g. due to a connection error
+    start = context.get('astromech_metrics_start')
+    if start is None:
+        return
+    _record(
+        *context['astromech_metrics_key'], Calls=1, Errors=1, Latency=(time.perf_counter() - start) * 1000,
+        RequestBytes=context.get('astromech_metrics_request_bytes', 0),
+        Throttles=context.get('astromech_metrics_throttles', 0))
+
+
+def instrument(client: 'botocore.client.BaseClient') -> None:
+    """Registers the metrics event handlers on a client.
+
+    `enable()` does this for all the clients created by `astromech.clients`. Use this function for clients
+    that you create yourself. Instrumenting a client more than once has no further effect.
+    """
+    events = client.meta.events
+    # Registered first, because handlers like the one from botocore's Stubber may short-circuit the call
+    events.register_first('before-call.*.*', _before_call, unique_id='astromech-metrics-before-call')
+    events.register('request-created.*.*', _request_created, unique_id='astromech-metrics-request-created')
+    events.register('needs-retry.*.*', _needs_retry, unique_id='astromech-metrics-needs-retry')
+    events.register('after-call.*.*', _after_call, unique_id='astromech-metrics-after-call')
+    events.register('after-call-error.*.*', _after_call_error, unique_id='astromech-metrics-after-call-error')
+
+
+def enable(namespace: Optional[str] = None) -> None:
+    """Turns on metrics for all the clients created by `astromech.clients`, including existing ones.
+
+    Args:
+        namespace: The CloudWatch namespace for the metrics. Defaults to the environment variable
+            "ASTROMECH_METRICS_NAMESPACE", or else "Astromech".
+    """
+    global _enabled, _namespace
+    _namespace = namespace or os.environ.get('ASTROMECH_METRICS_NAMESPACE', 'Astromech')
+    if not _enabled:
+        _enabled = True
+        clients.on_client_created(instrument)
+
+
+def snapshot() -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Returns a copy of the metrics aggregated since the last flush, by (service, operation)."""
+    with _lock:
+        return {key: dict(stats, Latency=list(stats['Latency'])) for key, stats in _stats.items()}
+
+
+def _document(stats: Dict[Tuple[str, str], Dict[str, Any]]) -> dict:
+    """Builds the EMF document for the aggregated metrics."""
+    function_name = os.environ.get('AWS_LAMBDA_FUNCTION_NAME')
+    document: Dict[str, Any] = {}
+    definitions: List[dict] = []
+    for (service, operation), values in sorted(stats.items()):
+        for name, unit in _UNITS.items():
+            metric = f'{service}.{operation}.{name}'
+            definitions.append({'Name': metric, 'Unit': unit})
+            document[metric] = values[name][-MAX_VALUES:] if name == 'Latency' else values[name]
+    dimensions: List[List[str]] = [[]]
+    if function_name:
+        document['FunctionName'] = function_name
+        dimensions = [['FunctionName']]
+    document['_aws'] = {
+        'Timestamp': int(time.time() * 1000),
+        'CloudWatchMetrics': [
+            {'Namespace': _namespace, 'Dimensions': dimensions, 'Metrics': definitions[i:i + MAX_METRICS]}
+            for i in range(0, len(definitions), MAX_METRICS)]}
+    return document
+
+
+def flush(stream: Optional[IO[str]] = None) -> None:
+    """Writes the aggregated metrics as a single EMF log line, and resets them.
+
+    Does nothing if no calls were recorded since the last flush.
+
+    Args:
+        stream: Where to write the line. Defaults to stdout.
+    """
+    global _stats
+    with _lock:
+        stats, _stats = _stats, {}
+    if stats:
+        print(json.dumps(_document(stats), separators=(',', ':')), file=stream or sys.stdout, flush=True)
+
+
+def flush_on_return(handler: Callable) -> Callable:
+    """A decorator for `lambda_handler()` that calls `flush()` at the end of every invocation."""
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        try:
+            return handler(*args, **kwargs)
+        finally:
+            flush()
+    return wrapper
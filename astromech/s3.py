@@ -1,12 +1,13 @@
 import os
-from typing import Tuple, Union
+from typing import Tuple, TYPE_CHECKING, Union
 import urllib.parse
 
-import boto3
-import botocore
-
+from astromech import clients, singleflight
 from astromech.logging import logger
 
+if TYPE_CHECKING:
+    import botocore.client
+
 _client = None
 """A boto S3 client, initialized lazily by `client()`.
 
@@ -17,7 +18,7 @@ Do not use this directly! Instead, use the `client()` function to get an initial
 """
 
 
-def client() -> botocore.client.BaseClient:
+def client() -> 'botocore.client.BaseClient':
     """Returns an S3 client object.
 
     This function always returns the global client object, initializing it if necessary.
@@ -27,14 +28,16 @@ def client() -> botocore.client.BaseClient:
     If the environment variable "LOCALSTACK_S3_URL" is present, uses that as the endpoint_url,
     instead of the real AWS URL.
 
+    The client is created by `astromech.clients`, which see for its configuration.
+
     Returns:
         The S3 client object.
     """
     global _client
     if _client is None:
-        endpoint_url = os.environ.get('LOCALSTACK_S3_URL')
-        # If endpoint_url is None, botocore constructs the default AWS URL
-        _client = boto3.client('s3', endpoint_url=endpoint_url)
+        with clients.lock:
+            if _client is None:
+                _client = clients.client('s3')
     return _client
 
 
@@ -107,6 +110,7 @@ def default_path(
     return (bucket, key)
 
 
+@singleflight.coalesce()
 def exists(bucket: str, key: str) -> bool:
     """Checks whether an object exists on S3.
 
@@ -114,6 +118,8 @@ def exists(bucket: str, key: str) -> bool:
     For example, if there's an object with key "path/to/object.txt", calling this function
     with "path/to/" returns False.
 
+    Concurrent calls for the same object are coalesced if `astromech.singleflight` is enabled.
+
     Args:
         bucket: The S3 bucket name.
         key: The S3 key.
@@ -122,9 +128,10 @@ def exists(bucket: str, key: str) -> bool:
         True if an object exists at the specified bucket and key, False otherwise.
         This function may also return False if the client lacks permissions.
     """
+    from botocore.exceptions import ClientError
     try:
         client().head_object(Bucket=bucket, Key=key)
-    except botocore.client.ClientError:
+    except ClientError:
         return False
     else:
         return True
@@ -144,9 +151,12 @@ def get_size(bucket: str, key: str) -> int:
     return response['ContentLength']
 
 
+@singleflight.coalesce()
 def get_bytes(bucket: str, key: str) -> bytes:
     """Gets the contents of an object on S3.
 
+    Concurrent calls for the same object are coalesced if `astromech.singleflight` is enabled.
+
     Args:
         bucket: The source S3 bucket name.
         key: The source S3 key.
@@ -154,7 +164,7 @@ def get_bytes(bucket: str, key: str) -> bytes:
     Returns:
         The object, as a bytes buffer.
     """
-    logger.debug(f'Reading from s3://{bucket}/{key}')
+    logger.debug('Reading from s3://%s/%s', bucket, key)
     response = client().get_object(Bucket=bucket, Key=key)
     return response['Body'].read()
 
@@ -180,7 +190,7 @@ def get_tags(bucket: str, key: str) -> dict:
     Returns:
         The object tags, as a dict.
     """
-    logger.debug(f'Reading tags from s3://{bucket}/{key}')
+    logger.debug('Reading tags from s3://%s/%s', bucket, key)
     response = client().get_object_tagging(Bucket=bucket, Key=key)
     return dict((tag['Key'], tag['Value']) for tag in response['TagSet'])
 
@@ -205,7 +215,18 @@ def put_bytes(buf: bytes, bucket: str, key: str, tags: dict = {}, acl: str = 'pr
         - The key.
         - The number of bytes written (length of the buffer).
     """
-    logger.debug(f'Writing {len(buf)} bytes to s3://{bucket}/{key}')
+    logger.debug('Writing %d bytes to s3://%s/%s', len(buf), bucket, key)
     tagging = urllib.parse.urlencode(tags)
     client().put_object(Bucket=bucket, Key=key, Body=buf, Tagging=tagging, ACL=acl)
     return (bucket, key, len(buf))
+
+
+def delete(bucket: str, key: str) -> None:
+    """Deletes an object from S3.
+
+    Args:
+        bucket: The S3 bucket name.
+        key: The S3 key.
+    """
+    logger.debug('Deleting s3://%s/%s', bucket, key)
+    client().delete_object(Bucket=bucket, Key=key)
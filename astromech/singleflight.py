@@ -0,0 +1,140 @@
+"""Coalescing of identical concurrent calls (single-flight).
+
+When several threads make the same call at the same time, only the first one actually runs it. The others wait for
+it to complete, and get the same result, or have the same exception raised. Once the call completes, the next one
+runs again: nothing is cached.
+
+The read helpers `s3.get_bytes()`, `s3.exists()`, `dynamodb.exists()` and `ssm.get_param_value()` coalesce their
+calls once `enable()` is called:
+```python
+from astromech import singleflight
+
+singleflight.enable()
+```
+
+Since the waiting threads share the result object, don't modify it in place.
+"""
+import concurrent.futures
+import functools
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_enabled = False
+
+
+class Group:
+    """A namespace of calls, in which calls with the same key are coalesced."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, concurrent.futures.Future] = {}
+        self._calls = 0
+        self._saved = 0
+
+    def do(self, key: Hashable, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Calls a function, unless a call with the same key is already in progress.
+
+        Args:
+            key: Identifies the call. Calls with equal keys must be interchangeable.
+            func: The function to call.
+            args: Positional arguments for the function.
+            kwargs: Keyword arguments for the function.
+
+        Returns:
+            The return value of the function, either from this call or from the one in progress.
+
+        Raises:
+            Any exception raised by the function, either in this call or in the one in progress.
+        """
+        with self._lock:
+            self._calls += 1
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                future: concurrent.futures.Future = concurrent.futures.Future()
+                self._inflight[key] = future
+            else:
+                self._saved += 1
+        if inflight is not None:
+            return inflight.result()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Returns True if a call with the specified key is in progress."""
+        with self._lock:
+            return key in self._inflight
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of calls made through `do()`, and how many of them waited for another call
+        rather than running the function themselves.
+        """
+        with self._lock:
+            return {'calls': self._calls, 'saved': self._saved}
+
+    def reset_stats(self) -> None:
+        """Sets the counters of `stats()` back to zero."""
+        with self._lock:
+            self._calls = self._saved = 0
+
+
+_group = Group()
+"""The group that `coalesce()` uses for all the functions it decorates."""
+
+
+def enable() -> None:
+    """Turns on coalescing for the functions decorated with `coalesce()`."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """Turns off coalescing. Calls that are already waiting for another call still get its result."""
+    global _enabled
+    _enabled = False
+
+
+def enabled() -> bool:
+    """Returns True if coalescing is turned on."""
+    return _enabled
+
+
+def stats() -> Dict[str, int]:
+    """Returns the number of coalesced calls, and how many of them were saved. See `Group.stats()`.
+
+    Calls made while coalescing is turned off aren't counted.
+    """
+    return _group.stats()
+
+
+def reset_stats() -> None:
+    """Sets the counters of `stats()` back to zero."""
+    _group.reset_stats()
+
+
+def coalesce(key: Optional[Callable[..., Hashable]] = None) -> Callable[[Callable], Callable]:
+    """A decorator that coalesces identical concurrent calls to a function, while `enable()` is in effect.
+
+    Args:
+        key: A function that takes the same arguments as the decorated function, and returns a hashable value that
+            identifies the call. Defaults to the arguments themselves, which must then be hashable.
+    """
+    def decorator(func: Callable) -> Callable:
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            call_key = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            return _group.do((name, call_key), func, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,12 +1,19 @@
+import collections
+import concurrent.futures
+import functools
 import json
 import os
-from typing import Any, Union
-
-import boto3
-import botocore
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING, Union
 
+from astromech import claimcheck, clients
 from astromech.logging import logger
 
+if TYPE_CHECKING:
+    import botocore.client
+
 _client = None
 """A boto SNS client, initialized lazily by `client()`.
 
@@ -17,7 +24,7 @@ Do not use this directly! Instead, use the `client()` function to get an initial
 """
 
 
-def client() -> botocore.client.BaseClient:
+def client() -> 'botocore.client.BaseClient':
     """Returns an SNS client object.
 
     This function always returns the global client object, initializing it if necessary.
@@ -27,25 +34,84 @@ def client() -> botocore.client.BaseClient:
     If the environment variable "LOCALSTACK_SNS_URL" is present, uses that as the endpoint_url,
     instead of the real AWS URL.
 
+    The client is created by `astromech.clients`, which see for its configuration.
+
     Returns:
         The SNS client object.
     """
     global _client
     if _client is None:
-        endpoint_url = os.environ.get('LOCALSTACK_SNS_URL')
-        # If endpoint_url is None, botocore constructs the default AWS URL
-        _client = boto3.client('sns', endpoint_url=endpoint_url)
+        with clients.lock:
+            if _client is None:
+                _client = clients.client('sns')
     return _client
 
 
+BATCH_SIZE = 10
+"""The maximum number of messages in a single `publish_batch` request."""
+
+BATCH_BYTES = 256 * 1024
+"""The maximum total size, in bytes, of the messages in a single `publish_batch` request."""
+
+MAX_ATTEMPTS = 3
+"""How many times `publish_many()` attempts to publish each message before giving up."""
+
+_MAX_WORKERS = 10
+"""The maximum number of threads that send batches concurrently."""
+
+
+class PublishError(RuntimeError):
+    """Raised when some messages could not be published.
+
+    The `failed` attribute holds the failure entries returned by SNS for the messages that weren't published,
+    with their "Id" being the index of the payload in the list that was passed to `publish_many()`. Messages whose
+    batch request raised an exception get an entry as well, with the exception's class name as their "Code".
+    """
+
+    def __init__(self, message: str, failed: List[dict]) -> None:
+        super().__init__(message)
+        self.failed = failed
+
+
+def _attributes(context: Any, extra_attributes: dict) -> dict:
+    """Returns the message attributes: the sender function name and version, plus `extra_attributes`."""
+    attributes = {
+        'sender': {'DataType': 'String', 'StringValue': context.function_name},
+        'sender_version': {'DataType': 'String', 'StringValue': context.function_version}}
+    attributes.update(extra_attributes)
+    return attributes
+
+
+def _message(payload: dict, attributes: dict) -> Tuple[str, dict]:
+    """Serializes a payload, offloading it to S3 if claim-check applies.
+
+    Returns:
+        A 2-tuple:
+        - The message to publish.
+        - The message attributes. These are `attributes` itself, unless the payload was offloaded, in which
+          case it's a copy with the claim-check pointer added.
+    """
+    message = json.dumps(payload)
+    uri = claimcheck.offload(message)
+    if uri:
+        logger.debug('Message offloaded to %s', uri)
+        attributes = dict(attributes)
+        attributes[claimcheck.ATTRIBUTE] = {'DataType': 'String', 'StringValue': uri}
+        message = json.dumps({claimcheck.ATTRIBUTE: uri})
+    return (message, attributes)
+
+
 def publish(
     topic_arn: str, context: Any, payload: dict, extra_attributes: dict = {}, subject: Union[str, None] = None
-) -> int:
+) -> Union[str, concurrent.futures.Future]:
     """Publishes a message to the specified topic on SNS.
 
     The function name and version from the context are added automatically as message attributes.
     You can provide additional attributes using the extra_attributes parameter.
 
+    If claim-check is enabled (see `astromech.claimcheck`) and the serialized payload exceeds the threshold,
+    the payload is stored on S3 and the published message only carries a pointer to it.
+
     Args:
         context: The context object from `lambda_handler()`.
         payload: The event payload. Must be JSON-serializeable.
@@ -55,28 +121,32 @@ def publish(
         subject: An optional subject for the event. If you do not provide one, a default subject
             is generated using the function name from the context.
 
+    If background publishing is on (see `start_background_publishing()`), the message is queued instead
+    of being sent right away, and the function returns a future.
+
     Returns:
         The unique message id on SNS.
+        With background publishing, a `concurrent.futures.Future` that resolves to the message id instead.
     """
-    attributes = {
-        'sender': {'DataType': 'String', 'StringValue': context.function_name},
-        'sender_version': {'DataType': 'String', 'StringValue': context.function_version}}
-    attributes.update(extra_attributes)
     subject = subject or f'Message from {context.function_name}'
-    logger.debug(f'Publishing message: {payload} to topic: {topic_arn}')
+    message, attributes = _message(payload, _attributes(context, extra_attributes))
+    if _publisher is not None:
+        logger.debug('Queueing message: %s to topic: %s', payload, topic_arn)
+        return _publisher.submit(topic_arn, {'Message': message, 'Subject': subject, 'MessageAttributes': attributes})
+    logger.debug('Publishing message: %s to topic: %s', payload, topic_arn)
     response = client().publish(
         TopicArn=topic_arn,
         Subject=subject,
-        Message=json.dumps(payload),
+        Message=message,
         MessageAttributes=attributes)
     message_id = response["MessageId"]
-    logger.debug(f'Message published. Message id: {message_id}')
+    logger.debug('Message published. Message id: %s', message_id)
     return message_id
 
 
 def publish_to_bus(
     context: Any, payload: dict, extra_attributes: dict = {}, subject: Union[str, None] = None
-) -> int:
+) -> Union[str, concurrent.futures.Future]:
     """A convenience function that publishes to the application message bus topic on SNS.
 
     Calls `publish()` with a default topic ARN.
@@ -84,3 +154,309 @@ def publish_to_bus(
     """
     message_bus_arn = os.environ['MESSAGE_BUS_ARN']
     return publish(message_bus_arn, context, payload, extra_attributes, subject)
+
+
+def _entry_size(entry: dict) -> int:
+    """Returns the size of a batch entry, in bytes, as SNS counts it towards the request limit."""
+    size = len(entry['Message'].encode('utf-8')) + len(entry['Subject'].encode('utf-8'))
+    for name, attribute in entry['MessageAttributes'].items():
+        if attribute['DataType'].startswith('Binary'):
+            value = attribute['BinaryValue']
+        else:
+            value = attribute['StringValue']
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        size += len(name) + len(attribute['DataType']) + len(value)
+    return size
+
+
+def _pack(entries: Iterable[dict]) -> List[List[dict]]:
+    """Packs batch entries into batches of up to `BATCH_SIZE` entries and `BATCH_BYTES` bytes.
+
+    Entries keep their order. An entry that is too large by itself gets a batch of its own.
+    """
+    batches: List[List[dict]] = []
+    batch: List[dict] = []
+    batch_bytes = 0
+    for entry in entries:
+        size = _entry_size(entry)
+        if batch and (len(batch) == BATCH_SIZE or batch_bytes + size > BATCH_BYTES):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(entry)
+        batch_bytes += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _failures(entries: List[dict], error: Exception) -> List[dict]:
+    """Returns failure entries, like those of a `publish_batch` response, for entries that raised an error."""
+    return [
+        {'Id': entry['Id'], 'Code': type(error).__name__, 'Message': str(error), 'SenderFault': False}
+        for entry in entries]
+
+
+def _publish_batch(topic_arn: str, entries: List[dict]) -> Tuple[Dict[str, str], List[dict]]:
+    """Publishes a single batch, retrying only the entries that failed.
+
+    Entries that failed due to a sender fault are not retried, since they would fail again. If the request itself
+    fails, e.g. with a `ClientError` once botocore gave up retrying, the entries that weren't published yet fail
+    with that error, and the message ids from earlier attempts are kept.
+
+    Returns:
+        A 2-tuple:
+        - A dict of message ids on SNS, by entry id.
+        - The failure entries for messages that could not be published.
+    """
+    message_ids: Dict[str, str] = {}
+    rejected: List[dict] = []
+    failed: List[dict] = []
+    for attempt in range(MAX_ATTEMPTS):
+        if attempt:
+            logger.debug('Retrying %d failed entries in batch to topic: %s', len(entries), topic_arn)
+            time.sleep(0.05 * 2 ** attempt)
+        try:
+            response = client().publish_batch(TopicArn=topic_arn, PublishBatchRequestEntries=entries)
+        except Exception as e:
+            failed = _failures(entries, e)
+            break
+        message_ids.update((success['Id'], success['MessageId']) for success in response.get('Successful', []))
+        rejected.extend(failure for failure in response.get('Failed', []) if failure.get('SenderFault'))
+        failed = [failure for failure in response.get('Failed', []) if not failure.get('SenderFault')]
+        if not failed:
+            break
+        failed_ids = set(failure['Id'] for failure in failed)
+        entries = [entry for entry in entries if entry['Id'] in failed_ids]
+    return (message_ids, rejected + failed)
+
+
+def publish_many(
+    topic_arn: str, context: Any, payloads: List[dict], extra_attributes: dict = {},
+    subject: Union[str, None] = None
+) -> List[str]:
+    """Publishes many messages to the specified topic on SNS, using batch requests.
+
+    Messages are packed into batches of up to 10 messages each, and no more than 256 KB in total.
+    The batches are sent concurrently. Messages that SNS fails to publish are retried, up to `MAX_ATTEMPTS`
+    attempts in total, without resending the rest of their batch.
+
+    The message attributes and subject are the same as with `publish()`, and are computed just once for all
+    messages. Claim-check applies to each message separately.
+
+    Args:
+        context: The context object from `lambda_handler()`.
+        payloads: The event payloads. Each must be JSON-serializeable.
+        extra_attributes: Event attributes in addition to / overriding the defaults. See `publish()`.
+        subject: An optional subject for the events. See `publish()`.
+
+    Returns:
+        The unique message ids on SNS, in the same order as the payloads.
+
+    Raises:
+        PublishError if any of the messages could not be published, including when a whole batch request failed.
+        All other messages are still published. Its `failed` list has an entry for every failed message.
+    """
+    subject = subject or f'Message from {context.function_name}'
+    attributes = _attributes(context, extra_attributes)
+    entries = []
+    for i, payload in enumerate(payloads):
+        message, message_attributes = _message(payload, attributes)
+        entries.append({'Id': str(i), 'Message': message, 'Subject': subject, 'MessageAttributes': message_attributes})
+    batches = _pack(entries)
+    logger.debug('Publishing %d messages in %d batches to topic: %s', len(entries), len(batches), topic_arn)
+    message_ids: Dict[str, str] = {}
+    failed: List[dict] = []
+    if batches:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(batches), _MAX_WORKERS)) as executor:
+            for batch_ids, batch_failed in executor.map(lambda batch: _publish_batch(topic_arn, batch), batches):
+                message_ids.update(batch_ids)
+                failed.extend(batch_failed)
+    if failed:
+        raise PublishError(f'Failed to publish {len(failed)} of {len(entries)} messages to topic: {topic_arn}', failed)
+    return [message_ids[str(i)] for i in range(len(entries))]
+
+
+def publish_many_to_bus(
+    context: Any, payloads: List[dict], extra_attributes: dict = {}, subject: Union[str, None] = None
+) -> List[str]:
+    """A convenience function that publishes many messages to the application message bus topic on SNS.
+
+    Calls `publish_many()` with a default topic ARN.
+    The message bus ARN must be specified by the environment variable "MESSAGE_BUS_ARN".
+    """
+    message_bus_arn = os.environ['MESSAGE_BUS_ARN']
+    return publish_many(message_bus_arn, context, payloads, extra_attributes, subject)
+
+
+class _BackgroundPublisher:
+    """Publishes queued messages in batches, from a worker thread. See `start_background_publishing()`."""
+
+    def __init__(self, linger: float) -> None:
+        self._linger = linger
+        self._queue: queue.Queue = queue.Queue()
+        self._condition = threading.Condition()
+        self._pending = 0
+        self._failed: List[dict] = []
+        self._thread = threading.Thread(target=self._run, name='astromech-sns-publisher', daemon=True)
+        self._thread.start()
+
+    def submit(self, topic_arn: str, entry: dict) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._condition:
+            self._pending += 1
+        self._queue.put((topic_arn, entry, future))
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._pending == 0, timeout):
+                raise TimeoutError(f'Timed out with {self._pending} messages still pending')
+            failed, self._failed = self._failed, []
+        if failed:
+            raise PublishError(f'Failed to publish {len(failed)} messages in the background', failed)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        try:
+            self.flush(timeout)
+        finally:
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _drain(self) -> list:
+        """Waits for a message, then collects whatever else arrives in the following `linger` seconds."""
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self._linger
+        while items[-1] is not None and len(items) < BATCH_SIZE * _MAX_WORKERS:
+            try:
+                items.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self) -> None:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=_MAX_WORKERS) as executor:
+            while True:
+                items = self._drain()
+                stop = items[-1] is None
+                by_topic: Dict[str, list] = collections.defaultdict(list)
+                for topic_arn, entry, future in filter(None, items):
+                    by_topic[topic_arn].append((entry, future))
+                jobs: List[concurrent.futures.Future] = []
+                for topic_arn, topic_items in by_topic.items():
+                    entries = [dict(entry, Id=str(i)) for i, (entry, _) in enumerate(topic_items)]
+                    futures = {str(i): future for i, (_, future) in enumerate(topic_items)}
+                    try:
+                        batches = _pack(entries)
+                    except Exception as e:
+                        # For example, a malformed message attribute. The thread must survive, or every
+                        # message published from now on would be lost, and flush() would never return.
+                        self._complete(topic_arn, futures, {}, _failures(entries, e))
+                        continue
+                    for batch in batches:
+                        batch_futures = {entry['Id']: futures[entry['Id']] for entry in batch}
+                        jobs.append(executor.submit(self._send, topic_arn, batch, batch_futures))
+                concurrent.futures.wait(jobs)
+                if stop:
+                    return
+
+    def _send(self, topic_arn: str, batch: List[dict], futures: Dict[str, concurrent.futures.Future]) -> None:
+        try:
+            message_ids, failed = _publish_batch(topic_arn, batch)
+        except Exception as e:
+            message_ids, failed = {}, _failures(batch, e)
+        self._complete(topic_arn, futures, message_ids, failed)
+
+    def _complete(
+        self, topic_arn: str, futures: Dict[str, concurrent.futures.Future], message_ids: Dict[str, str],
+        failed: List[dict]
+    ) -> None:
+        """Resolves the futures of the messages, and marks them as no longer pending.
+
+        A message that has neither a message id nor a failure entry fails as well.
+        """
+        failed = list(failed)
+        failed_ids = set(failure['Id'] for failure in failed)
+        failed.extend(
+            {'Id': entry_id, 'Code': 'MissingResult', 'Message': 'No result for message', 'SenderFault': False}
+            for entry_id in futures if entry_id not in message_ids and entry_id not in failed_ids)
+        for entry_id, message_id in message_ids.items():
+            futures[entry_id].set_result(message_id)
+        for failure in failed:
+            futures[failure['Id']].set_exception(PublishError(f'Failed to publish to topic: {topic_arn}', [failure]))
+        with self._condition:
+            self._failed.extend(dict(failure, TopicArn=topic_arn) for failure in failed)
+            self._pending -= len(futures)
+            self._condition.notify_all()
+
+
+_publisher: Optional[_BackgroundPublisher] = None
+"""The background publisher, when background publishing is on.
+
+Do not use this directly! Instead, use `start_background_publishing()` and `flush()`.
+"""
+
+
+def start_background_publishing(linger: float = 0.01) -> None:
+    """Turns on background publishing.
+
+    From now on, `publish()` and `publish_to_bus()` queue their messages and return immediately.
+    A worker thread collects the queued messages into batches and sends them with `publish_batch`,
+    while the handler keeps working.
+
+    You *must* call `flush()` before the handler returns, or decorate the handler with `flush_on_return()`.
+    Otherwise, messages may still be waiting in the queue when Lambda freezes the container.
+
+    Calling this function again while background publishing is on does nothing.
+
+    Args:
+        linger: How long, in seconds, the worker waits for more messages to fill a batch.
+    """
+    global _publisher
+    if _publisher is None:
+        _publisher = _BackgroundPublisher(linger)
+
+
+def stop_background_publishing(timeout: Optional[float] = None) -> None:
+    """Flushes the queue and turns off background publishing.
+
+    Args:
+        timeout: See `flush()`.
+
+    Raises:
+        See `flush()`. Background publishing is turned off even if an exception is raised.
+    """
+    global _publisher
+    if _publisher is not None:
+        publisher, _publisher = _publisher, None
+        publisher.stop(timeout)
+
+
+def flush(timeout: Optional[float] = None) -> None:
+    """Waits until all the messages queued by background publishing are sent.
+
+    Does nothing if background publishing is off.
+
+    Args:
+        timeout: The maximum time to wait, in seconds. Waits indefinitely if None.
+
+    Raises:
+        PublishError if any message queued since the previous flush could not be published.
+        TimeoutError if the messages weren't sent in time.
+    """
+    if _publisher is not None:
+        _publisher.flush(timeout)
+
+
+def flush_on_return(handler: Callable) -> Callable:
+    """A decorator for `lambda_handler()` that calls `flush()` before the handler returns.
+
+    The flush happens whether the handler returns normally or raises an exception.
+    """
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        try:
+            return handler(*args, **kwargs)
+        finally:
+            flush()
+    return wrapper
@@ -1,9 +1,11 @@
-import json
-import os
-from typing import Generator
+import concurrent.futures
+from typing import Any, Dict, Generator, Optional, Tuple, TYPE_CHECKING
 
-import boto3
-import botocore
+from astromech import claimcheck, clients, json
+from astromech.logging import logger
+
+if TYPE_CHECKING:
+    import botocore.client
 
 _client = None
 """A boto SQS client, initialized lazily by `client()`.
@@ -15,7 +17,7 @@ Do not use this directly! Instead, use the `client()` function to get an initial
 """
 
 
-def client() -> botocore.client.BaseClient:
+def client() -> 'botocore.client.BaseClient':
     """Returns an SQS client object.
 
     This function always returns the global client object, initializing it if necessary.
@@ -25,34 +27,173 @@ def client() -> botocore.client.BaseClient:
     If the environment variable "LOCALSTACK_SQS_URL" is present, uses that as the endpoint_url,
     instead of the real AWS URL.
 
+    The client is created by `astromech.clients`, which see for its configuration.
+
     Returns:
         The SQS client object.
     """
     global _client
     if _client is None:
-        endpoint_url = os.environ.get('LOCALSTACK_SQS_URL')
-        # If endpoint_url is None, botocore constructs the default AWS URL
-        _client = boto3.client('sqs', endpoint_url=endpoint_url)
+        with clients.lock:
+            if _client is None:
+                _client = clients.client('sqs')
     return _client
 
 
-def parse_event(event: dict) -> Generator:
+_UNDECODED = object()
+"""Sentinel for a `Message` body that hasn't been decoded yet."""
+
+
+class Message:
+    """A message from a SQS event, whose body is deserialized lazily.
+
+    The record body is only decoded the first time `body` is accessed, and the result is cached.
+    Records that are never looked at cost nothing to decode.
+    """
+
+    __slots__ = ('record', '_unwrap', '_raw', '_body')
+
+    def __init__(self, record: dict, unwrap: bool = False, raw_body: Any = None) -> None:
+        self.record = record
+        """The raw SQS record."""
+        self._unwrap = unwrap
+        self._raw = raw_body if raw_body is not None else record['body']
+        self._body: Any = _UNDECODED
+
+    @property
+    def message_id(self) -> str:
+        """The SQS message id of the record."""
+        return self.record['messageId']
+
+    @property
+    def body(self) -> Any:
+        """The deserialized message body. See `parse_event()` for how it is decoded."""
+        if self._body is _UNDECODED:
+            self._body = _decode(self._raw, self._unwrap)
+        return self._body
+
+
+def _is_sns_envelope(item: Any) -> bool:
+    return isinstance(item, dict) and item.get('Type') == 'Notification' and 'TopicArn' in item
+
+
+def _is_s3_event(item: Any) -> bool:
+    if not isinstance(item, dict):
+        return False
+    records = item.get('Records')
+    return (
+        bool(records) and isinstance(records, list) and isinstance(records[0], dict)
+        and records[0].get('eventSource') == 'aws:s3')
+
+
+def _decode(body: Any, unwrap: bool) -> Any:
+    """Decodes a single record body, optionally unwrapping SNS envelopes and S3 event notifications.
+
+    `body` is normally the raw string from the record, but may also be an already decoded SNS envelope.
+    """
+    item = json.loads_or_raw(body) if isinstance(body, str) else body
+    if unwrap:
+        if _is_sns_envelope(item):
+            item = json.loads_or_raw(item['Message'])
+        if _is_s3_event(item):
+            item = item['Records']
+    return item
+
+
+_MAX_WORKERS = 10
+"""The maximum number of threads that fetch claim-checked payloads concurrently."""
+
+
+def _claim_check(record: dict) -> Optional[Tuple[str, Optional[dict]]]:
+    """Finds the claim-check pointer of a record, if there is one.
+
+    Looks for the claim-check attribute in the record's message attributes (raw message delivery),
+    or else in the message attributes of the SNS envelope in its body.
+    Only bodies that mention the attribute name are decoded.
+    Pointers outside of the claim-check location (see `claimcheck.owns()`) are ignored with a warning, and the
+    record is then treated as a regular message.
+
+    Returns:
+        None if the record doesn't carry a valid claim-check. Otherwise a 2-tuple:
+        - The S3 URI of the payload.
+        - The decoded SNS envelope, or None for raw message delivery.
+    """
+    claim: Optional[Tuple[str, Optional[dict]]] = None
+    attribute = record.get('messageAttributes', {}).get(claimcheck.ATTRIBUTE)
+    if attribute:
+        claim = (attribute['stringValue'], None)
+    elif claimcheck.ATTRIBUTE in record['body']:
+        item = json.loads_or_raw(record['body'])
+        if _is_sns_envelope(item):
+            attribute = item.get('MessageAttributes', {}).get(claimcheck.ATTRIBUTE)
+            if attribute:
+                claim = (attribute['Value'], item)
+    if claim and not claimcheck.owns(claim[0]):
+        logger.warning('Ignoring claim-check outside of the claim-check location: %s', claim[0])
+        return None
+    return claim
+
+
+def _fetch_claim_check(uri: str, envelope: Optional[dict]) -> Any:
+    """Fetches a claim-checked payload, and puts it back in its SNS envelope if it came in one."""
+    message = claimcheck.fetch(uri)
+    return message if envelope is None else dict(envelope, Message=message)
+
+
+def parse_event(
+    event: dict, lazy: bool = False, unwrap: bool = False, claim_checks: bool = True,
+    delete_claim_checks: bool = False
+) -> Generator:
     """Yields messages from a SQS events.
 
     Use this in lambda functions that receive events from SQS, where the SQS queue is subscribed
     to an SNS topic with raw message delivery.
 
     Attempts to deserialize each record body from JSON. If the body isn't JSON, returns it as-is.
+    Decoding uses the backend from `astromech.json`, which see for plugging in a faster decoder like orjson.
+
+    Messages whose payload was offloaded to S3 by claim-check (see `astromech.claimcheck`) are replaced
+    by the payload. The payloads of all the records in the event are fetched concurrently. Only pointers
+    into the configured claim-check bucket and key prefix are followed, so nothing is fetched unless
+    "CLAIM_CHECK_BUCKET" is set.
 
     Args:
         event: The event from `lambda_handler()`.
+        lazy: If True, yields a `Message` for each record instead of its body. The body is only
+            deserialized when `Message.body` is first accessed.
+        unwrap: If True, unwraps the body in the same pass that decodes it:
+            - SNS notification envelopes (queues subscribed without raw message delivery) are replaced
+              by their deserialized inner message.
+            - S3 event notifications, whether delivered directly or through SNS, are replaced by the
+              list of S3 event records they contain.
+        claim_checks: Whether to fetch claim-checked payloads from S3.
+        delete_claim_checks: If True, deletes the claim-checked payloads from S3 once all the messages
+            were processed, i.e. when the generator is exhausted. If the caller stops iterating early, for
+            example due to an exception, no payload is deleted, so that when SQS redelivers the batch, every
+            message still finds its payload. Payloads that fail to delete are logged and left on S3, for
+            a lifecycle rule to expire, rather than failing the batch after others were already deleted.
 
     Yields:
-        The deserialized message bodies from the event records.
+        The deserialized message bodies from the event records, or `Message` objects if `lazy` is True.
     """
-    for record in event['Records']:
-        try:
-            item = json.loads(record['body'])
-        except ValueError:
-            item = record['body']
-        yield item
+    records = event['Records']
+    claims: Dict[int, Tuple[str, Optional[dict]]] = {}
+    if claim_checks and claimcheck.enabled():
+        for i, record in enumerate(records):
+            claim = _claim_check(record)
+            if claim:
+                claims[i] = claim
+    if not claims:
+        for record in records:
+            yield Message(record, unwrap) if lazy else _decode(record['body'], unwrap)
+        return
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(claims), _MAX_WORKERS)) as executor:
+        fetches = {i: executor.submit(_fetch_claim_check, *claim) for i, claim in claims.items()}
+        for i, record in enumerate(records):
+            body = fetches[i].result() if i in fetches else record['body']
+            yield Message(record, unwrap, body) if lazy else _decode(body, unwrap)
+        if delete_claim_checks:
+            deletes = {executor.submit(claimcheck.delete, uri): uri for uri, _ in claims.values()}
+            for future in concurrent.futures.as_completed(deletes):
+                if future.exception():
+                    logger.warning('Could not delete claim-check %s: %r', deletes[future], future.exception())
@@ -1,7 +1,12 @@
-import os
+import concurrent.futures
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
 
-import boto3
-import botocore
+from astromech import clients, singleflight
+
+if TYPE_CHECKING:
+    import botocore.client
 
 _client = None
 """A boto SSM (AWS Systems Manager) client, initialized lazily by `client()`.
@@ -13,7 +18,7 @@ Do not use this directly! Instead, use the `client()` function to get an initial
 """
 
 
-def client() -> botocore.client.BaseClient:
+def client() -> 'botocore.client.BaseClient':
     """Returns an SSM client object.
 
     This function always returns the global client object, initializing it if necessary.
@@ -23,23 +28,89 @@ def client() -> botocore.client.BaseClient:
     If the environment variable "LOCALSTACK_SSM_URL" is present, uses that as the endpoint_url,
     instead of the real AWS URL.
 
+    The client is created by `astromech.clients`, which see for its configuration.
+
     Returns:
         The SSM client object.
     """
     global _client
     if _client is None:
-        endpoint_url = os.environ.get('LOCALSTACK_SSM_URL')
-        # If endpoint_url is None, botocore constructs the default AWS URL
-        _client = boto3.client('ssm', endpoint_url=endpoint_url)
+        with clients.lock:
+            if _client is None:
+                _client = clients.client('ssm')
     return _client
 
 
-def get_param_value(param: str, decrypt: bool) -> str:
+GET_PARAMETERS_MAX = 10
+"""The maximum number of names in a single `get_parameters` request."""
+
+_cache: Dict[Tuple[str, bool], Tuple[str, float]] = {}
+"""Cached parameter values, by (name, decrypt), along with the monotonic time they expire at.
+
+The cache is global, so that it gets reused between invocations by the lambda function container.
+"""
+
+_loads = singleflight.Group()
+"""Lookups of uncached parameters, by (name, decrypt). Concurrent lookups of the same parameter are coalesced."""
+
+_lock = threading.Lock()
+"""Guards `_cache`."""
+
+
+def _store(key: Tuple[str, bool], value: str, ttl: float) -> None:
+    with _lock:
+        _cache[key] = (value, time.monotonic() + ttl)
+
+
+def _load(key: Tuple[str, bool], ttl: float) -> str:
+    """Gets a parameter from SSM and caches it.
+
+    If the same parameter is already being looked up by another thread, waits for that lookup instead
+    of sending another request.
+    """
+    def load():
+        response = client().get_parameter(Name=key[0], WithDecryption=key[1])
+        value = response['Parameter']['Value']
+        _store(key, value, ttl)
+        return value
+
+    return _loads.do(key, load)
+
+
+def _refresh(key: Tuple[str, bool], ttl: float) -> None:
+    """Reloads a parameter on a background thread, unless it's already being loaded."""
+    def refresh():
+        try:
+            _load(key, ttl)
+        except Exception:
+            pass  # The stale value stays in the cache, and the next lookup after it expires tries again
+
+    if _loads.in_flight(key):
+        return
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+@singleflight.coalesce()
+def _get_param_value(param: str, decrypt: bool) -> str:
+    """Gets a parameter from SSM, bypassing the cache."""
+    response = client().get_parameter(Name=param, WithDecryption=decrypt)
+    return response['Parameter']['Value']
+
+
+def get_param_value(param: str, decrypt: bool, ttl: Optional[float] = None, stale: float = 0) -> str:
     """Returns the value of the specified parameter from SSM ParameterStore.
 
+    Pass a `ttl` to cache the value in-process. Lookups of a cached parameter don't reach SSM until
+    the value expires, and concurrent lookups of the same parameter are sent to SSM only once.
+    Without a `ttl`, concurrent lookups are only coalesced if `astromech.singleflight` is enabled.
+
     Args:
         param: The name of the parameter in ParameterStore.
         decrypt: Whether to decrypt the parameter.
+        ttl: How long, in seconds, to cache the value for. If None, the value isn't cached and the cache
+            isn't consulted.
+        stale: For how long, in seconds, after the cached value expires to keep returning it.
+            Meanwhile, the value is refreshed on a background thread (stale-while-revalidate).
 
     Returns:
         The parameter value.
@@ -47,5 +118,80 @@ def get_param_value(param: str, decrypt: bool) -> str:
     Raises:
         Raises Any exceptions raised by boto due to missing parameters etc.
     """
-    response = client().get_parameter(Name=param, WithDecryption=decrypt)
-    return response['Parameter']['Value']
+    if ttl is None:
+        return _get_param_value(param, decrypt)
+    key = (param, decrypt)
+    with _lock:
+        entry = _cache.get(key)
+    if entry is not None:
+        value, expires = entry
+        now = time.monotonic()
+        if now < expires:
+            return value
+        if now < expires + stale:
+            _refresh(key, ttl)
+            return value
+    return _load(key, ttl)
+
+
+def _get_parameters(names: List[str], decrypt: bool, ttl: float) -> Dict[str, str]:
+    response = client().get_parameters(Names=names, WithDecryption=decrypt)
+    values = {}
+    for parameter in response['Parameters']:
+        values[parameter['Name']] = parameter['Value']
+        _store((parameter['Name'], decrypt), parameter['Value'], ttl)
+    return values
+
+
+def prefetch(params: Iterable[str], decrypt: bool, ttl: float) -> Dict[str, str]:
+    """Loads many parameters into the cache, using `get_parameters` batch requests.
+
+    The names are split into requests of up to 10 names each, and the requests are sent concurrently.
+    Names that don't exist in ParameterStore are skipped.
+
+    Args:
+        params: The names of the parameters in ParameterStore.
+        decrypt: Whether to decrypt the parameters.
+        ttl: How long, in seconds, to cache the values for. See `get_param_value()`.
+
+    Returns:
+        The parameter values, by name.
+    """
+    names = list(dict.fromkeys(params))
+    chunks = [names[i:i + GET_PARAMETERS_MAX] for i in range(0, len(names), GET_PARAMETERS_MAX)]
+    values: Dict[str, str] = {}
+    if len(chunks) == 1:
+        values.update(_get_parameters(chunks[0], decrypt, ttl))
+    elif chunks:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            for chunk_values in executor.map(lambda chunk: _get_parameters(chunk, decrypt, ttl), chunks):
+                values.update(chunk_values)
+    return values
+
+
+def prefetch_path(path: str, decrypt: bool, ttl: float, recursive: bool = True) -> Dict[str, str]:
+    """Loads all the parameters under a path into the cache, using `get_parameters_by_path`.
+
+    Args:
+        path: The path (name prefix) of the parameters in ParameterStore, like "/my-app/prod".
+        decrypt: Whether to decrypt the parameters.
+        ttl: How long, in seconds, to cache the values for. See `get_param_value()`.
+        recursive: Whether to load parameters from the whole hierarchy under the path, rather than only
+            its direct children.
+
+    Returns:
+        The parameter values, by name.
+    """
+    values = {}
+    paginator = client().get_paginator('get_parameters_by_path')
+    for page in paginator.paginate(Path=path, Recursive=recursive, WithDecryption=decrypt):
+        for parameter in page['Parameters']:
+            values[parameter['Name']] = parameter['Value']
+            _store((parameter['Name'], decrypt), parameter['Value'], ttl)
+    return values
+
+
+def clear_cache() -> None:
+    """Removes all the values from the parameter cache."""
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,29 @@
+"""Benchmarks reading DynamoDB items one by one, on threads, and in a single batch."""
+import concurrent.futures
+import os
+from typing import List
+
+from astromech import dynamodb
+from suite import Case
+
+KEYS = 100
+"""The number of items read by each case. This is also the maximum for a single `batch_get_item` request."""
+
+
+def cases() -> List[Case]:
+    os.environ.setdefault('DYNAMODB_TABLE', 'bench')
+    keys = [{'Id': str(i)} for i in range(KEYS)]
+
+    def threaded():
+        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+            return list(executor.map(dynamodb.exists, keys))
+
+    def batch():
+        table_name = dynamodb.table().name
+        return dynamodb.resource().batch_get_item(RequestItems={table_name: {'Keys': keys}})
+
+    return [
+        Case(f'dynamodb.exists x{KEYS}, sequential', lambda: [dynamodb.exists(key) for key in keys], items=KEYS,
+             repeat=3),
+        Case(f'dynamodb.exists x{KEYS}, 10 threads', threaded, items=KEYS, repeat=5),
+        Case(f'dynamodb batch_get_item x{KEYS}', batch, items=KEYS)]
@@ -0,0 +1,67 @@
+"""Benchmarks `astromech.s3`: writes and reads across object sizes, fan-out reads, and request coalescing."""
+import asyncio
+import concurrent.futures
+import functools
+from typing import List
+
+from astromech import aio, s3, singleflight
+from astromech.aio import s3 as as3
+from suite import Case
+
+BUCKET = 'bench-bucket'
+
+SIZES = {'1KiB': 1024, '64KiB': 64 * 1024, '1MiB': 1024 * 1024, '8MiB': 8 * 1024 * 1024}
+
+FAN_OUT = 50
+"""The number of objects read by the fan-out cases."""
+
+THREADS = 20
+"""The number of threads that read the same object at once in the coalescing cases."""
+
+
+def _read_same_object(key: str) -> None:
+    with concurrent.futures.ThreadPoolExecutor(max_workers=THREADS) as executor:
+        list(executor.map(lambda _: s3.get_bytes(BUCKET, key), range(THREADS)))
+
+
+def cases() -> List[Case]:
+    result = []
+    for label, size in SIZES.items():
+        buf = bytes(size)
+        key = f'sizes/{label}'
+        repeat = 5 if size > 1024 * 1024 else None
+        put = functools.partial(s3.put_bytes, buf, BUCKET, key)
+        result.append(Case(f's3.put_bytes {label}', put, repeat=repeat))
+        result.append(Case(
+            f's3.get_bytes {label}', functools.partial(s3.get_bytes, BUCKET, key), repeat=repeat, setup=put))
+
+    keys = [f'fan-out/{i}' for i in range(FAN_OUT)]
+
+    def put_keys():
+        for key in keys:
+            s3.put_bytes(b'x' * 1024, BUCKET, key)
+
+    result.append(Case(
+        f's3.get_bytes x{FAN_OUT}, sequential', lambda: [s3.get_bytes(BUCKET, key) for key in keys],
+        items=FAN_OUT, repeat=5, setup=put_keys))
+    result.append(Case(
+        f'aio.s3.get_bytes x{FAN_OUT}, gather',
+        lambda: asyncio.run(aio.gather(*(as3.get_bytes(BUCKET, key) for key in keys))), items=FAN_OUT,
+        setup=put_keys))
+
+    key = 'same-object'
+
+    def put_same_object():
+        s3.put_bytes(bytes(64 * 1024), BUCKET, key)
+
+    def setup_singleflight():
+        put_same_object()
+        singleflight.enable()
+
+    result.append(Case(
+        f's3.get_bytes x{THREADS} threads, same object', lambda: _read_same_object(key), items=THREADS,
+        setup=put_same_object))
+    result.append(Case(
+        f's3.get_bytes x{THREADS} threads, same object, singleflight', lambda: _read_same_object(key),
+        items=THREADS, setup=setup_singleflight, teardown=singleflight.disable))
+    return result
@@ -0,0 +1,31 @@
+"""Benchmarks publishing to SNS: one message at a time, in batches, and on the background publisher."""
+import collections
+from typing import List
+
+from astromech import sns
+from suite import Case
+
+TOPIC_ARN = 'arn:aws:sns:us-east-1:123456789012:bench'
+
+MESSAGES = 100
+"""The number of messages published by each case."""
+
+Context = collections.namedtuple('Context', 'function_name function_version')
+
+
+def cases() -> List[Case]:
+    context = Context('bench', '1')
+    payloads = [{'id': i, 'data': 'x' * 1024} for i in range(MESSAGES)]
+
+    def background():
+        for payload in payloads:
+            sns.publish(TOPIC_ARN, context, payload)
+        sns.flush()
+
+    return [
+        Case(f'sns.publish x{MESSAGES}, sequential', lambda: [sns.publish(TOPIC_ARN, context, p) for p in payloads],
+             items=MESSAGES, repeat=3),
+        Case(f'sns.publish_many x{MESSAGES}', lambda: sns.publish_many(TOPIC_ARN, context, payloads),
+             items=MESSAGES),
+        Case(f'sns.publish x{MESSAGES}, background', background, items=MESSAGES,
+             setup=sns.start_background_publishing, teardown=sns.stop_background_publishing)]
@@ -0,0 +1,108 @@
+"""Benchmarks `sqs.parse_event()`: decoding modes on a 10,000-record event, and fetching claim-checked payloads.
+
+The event mixes raw JSON bodies, SNS envelopes (no raw message delivery), S3 event notifications
+delivered through SNS, and plain-text bodies.
+"""
+import json
+import os
+from typing import List
+
+from astromech import claimcheck, s3, sqs
+from astromech import json as ajson
+from suite import Case
+
+RECORDS = 10_000
+
+CLAIM_CHECKS = 10
+"""The number of records with claim-checked payloads, in the claim-check case."""
+
+CLAIM_CHECK_SIZE = 512 * 1024
+
+CLAIM_CHECK_ENV = {'CLAIM_CHECK_BUCKET': 'bench-bucket', 'CLAIM_CHECK_KEY_PREFIX': 'claim-checks'}
+"""The claim-check location, which consumers only follow pointers into."""
+
+
+def make_event(n: int = RECORDS) -> dict:
+    payload = {'id': 0, 'name': 'astromech', 'tags': ['r2', 'd2'], 'nested': {'x': 1.5, 'y': None}}
+    s3_event = {'Records': [{
+        'eventSource': 'aws:s3',
+        'eventName': 'ObjectCreated:Put',
+        's3': {'bucket': {'name': 'bucket'}, 'object': {'key': 'path/to/key', 'size': 1024}}}]}
+
+    def envelope(message):
+        return json.dumps({
+            'Type': 'Notification', 'TopicArn': 'arn:aws:sns:us-east-1:1234567890:topic', 'Message': message})
+
+    bodies = [
+        json.dumps(payload),
+        envelope(json.dumps(payload)),
+        envelope(json.dumps(s3_event)),
+        'Hello from SQS!']
+    return {'Records': [{'messageId': str(i), 'body': bodies[i % len(bodies)]} for i in range(n)]}
+
+
+def baseline(event):
+    """The pre-existing approach: stdlib json, try/except, and a second pass to open envelopes."""
+    items = []
+    for record in event['Records']:
+        try:
+            item = json.loads(record['body'])
+        except ValueError:
+            item = record['body']
+        if isinstance(item, dict) and item.get('Type') == 'Notification':
+            try:
+                item = json.loads(item['Message'])
+            except ValueError:
+                item = item['Message']
+        items.append(item)
+    return items
+
+
+def make_claim_check_event(n: int = CLAIM_CHECKS) -> dict:
+    """Makes an event whose records point to payloads on S3, stored through the simulated endpoint."""
+    payload = json.dumps({'data': 'x' * CLAIM_CHECK_SIZE})
+    records = []
+    for i in range(n):
+        bucket, key = CLAIM_CHECK_ENV['CLAIM_CHECK_BUCKET'], f'{CLAIM_CHECK_ENV["CLAIM_CHECK_KEY_PREFIX"]}/{i}.json'
+        s3.put_bytes(payload.encode('utf-8'), bucket, key)
+        records.append({
+            'messageId': str(i), 'body': '{}',
+            'messageAttributes': {claimcheck.ATTRIBUTE: {'stringValue': s3.to_uri(bucket, key)}}})
+    return {'Records': records}
+
+
+def cases() -> List[Case]:
+    event = make_event()
+    claim_check_event = {}
+    saved_env = {name: os.environ.get(name) for name in CLAIM_CHECK_ENV}
+
+    def setup_claim_checks():
+        os.environ.update(CLAIM_CHECK_ENV)
+        claim_check_event.update(make_claim_check_event())
+
+    def teardown_claim_checks():
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    result = [
+        Case(f'sqs baseline (stdlib, two passes) x{RECORDS:,}', lambda: baseline(event), items=RECORDS, repeat=5),
+        Case(f'sqs.parse_event(unwrap=True) x{RECORDS:,}',
+             lambda: list(sqs.parse_event(event, unwrap=True)), items=RECORDS, repeat=5),
+        Case(f'sqs.parse_event(lazy=True, unwrap=True) x{RECORDS:,}, 10% read', lambda: [
+            m.body for i, m in enumerate(sqs.parse_event(event, lazy=True, unwrap=True)) if i % 10 == 0],
+            items=RECORDS, repeat=5),
+        Case(f'sqs.parse_event x{CLAIM_CHECKS} claim-checks, {CLAIM_CHECK_SIZE // 1024}KiB',
+             lambda: list(sqs.parse_event(claim_check_event)), items=CLAIM_CHECKS,
+             setup=setup_claim_checks, teardown=teardown_claim_checks)]
+    try:
+        import orjson
+    except ImportError:
+        return result
+    result.insert(2, Case(
+        f'sqs.parse_event(unwrap=True) x{RECORDS:,}, orjson', lambda: list(sqs.parse_event(event, unwrap=True)),
+        items=RECORDS, repeat=5, setup=lambda: ajson.set_backend(orjson.loads),
+        teardown=lambda: ajson.set_backend(json.loads)))
+    return result
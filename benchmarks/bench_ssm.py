@@ -0,0 +1,24 @@
+"""Benchmarks SSM parameter lookups: uncached, cached, and prefetched in batches."""
+from typing import List
+
+from astromech import ssm
+from suite import Case
+
+PARAMS = 30
+"""The number of parameters loaded by the multi-parameter cases."""
+
+
+def cases() -> List[Case]:
+    names = [f'/bench/param-{i}' for i in range(PARAMS)]
+
+    def prefetch():
+        ssm.clear_cache()
+        return ssm.prefetch(names, True, ttl=300)
+
+    return [
+        Case('ssm.get_param_value, uncached', lambda: ssm.get_param_value(names[0], True)),
+        Case('ssm.get_param_value, cached', lambda: ssm.get_param_value(names[0], True, ttl=300),
+             teardown=ssm.clear_cache),
+        Case(f'ssm.get_param_value x{PARAMS}, uncached', lambda: [ssm.get_param_value(n, True) for n in names],
+             items=PARAMS, repeat=5),
+        Case(f'ssm.prefetch x{PARAMS}', prefetch, items=PARAMS, teardown=ssm.clear_cache)]
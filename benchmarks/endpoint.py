@@ -0,0 +1,163 @@
+"""A simulated AWS endpoint, so that the benchmarks run offline.
+
+`simulate()` registers a botocore "before-send" handler on every client that astromech creates. The handler
+answers each request in-process, instead of sending it over the network, after sleeping for the configured latency.
+Everything up to the HTTP send - parameter validation, serialization, signing, checksums - and the parsing of the
+response runs as usual, so the benchmarks measure astromech and botocore rather than a mock.
+
+Supported operations:
+- S3: PutObject, GetObject, HeadObject, DeleteObject. Objects are kept in memory.
+- DynamoDB: GetItem, BatchGetItem. Every key exists, and the item is the key itself.
+- SNS: Publish, PublishBatch.
+- SSM: GetParameter, GetParameters. Every parameter exists, and its value is "value:[name]".
+"""
+import io
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+import urllib.parse
+import uuid
+
+from botocore.awsrequest import AWSResponse
+
+from astromech import clients
+
+
+class _Raw(io.BytesIO):
+    """A response body that botocore can both stream and read."""
+
+    def stream(self, **kwargs: Any):
+        yield self.read()
+
+
+def _dechunk(body: bytes) -> bytes:
+    """Decodes an "aws-chunked" request body, which botocore uses to send a trailing checksum."""
+    chunks = []
+    pos = 0
+    while True:
+        end = body.index(b'\r\n', pos)
+        size = int(body[pos:end].split(b';')[0], 16)
+        if size == 0:
+            return b''.join(chunks)
+        chunks.append(body[end + 2:end + 2 + size])
+        pos = end + 4 + size
+
+
+class Endpoint:
+    """Answers requests for all the supported services.
+
+    Args:
+        latency: The time, in seconds, that every request takes on top of the local processing.
+        bandwidth: If set, the transfer rate in bytes per second. Requests and responses additionally take
+            their size divided by this rate.
+    """
+
+    def __init__(self, latency: float = 0.01, bandwidth: Optional[float] = None) -> None:
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.objects: Dict[str, bytes] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def install(self, client: Any) -> None:
+        """Registers the endpoint on a client. Pass this to `clients.on_client_created()`."""
+        service = client.meta.service_model.service_name
+        client.meta.events.register(f'before-send.{service}', self._send, unique_id='astromech-bench-endpoint')
+
+    def _send(self, request: Any, event_name: str, **kwargs: Any) -> AWSResponse:
+        _, service, operation = event_name.split('.')
+        body = request.body
+        if hasattr(body, 'read'):
+            body = body.read()
+        body = body.encode('utf-8') if isinstance(body, str) else (body or b'')
+        status, headers, content = getattr(self, f'_{service}')(operation, request, body)
+        delay = self.latency
+        if self.bandwidth:
+            delay += (len(body) + len(content)) / self.bandwidth
+        time.sleep(delay)
+        with self._lock:
+            self.requests += 1
+        headers = {'x-amzn-requestid': str(uuid.uuid4()), 'Content-Length': str(len(content)), **headers}
+        return AWSResponse(request.url, status, headers, _Raw(content))
+
+    def _s3(self, operation: str, request: Any, body: bytes) -> Tuple[int, dict, bytes]:
+        path = urllib.parse.urlsplit(request.url)
+        name = f'{path.netloc}{path.path}'
+        if operation == 'PutObject':
+            if b'aws-chunked' in (request.headers.get('Content-Encoding') or b''):
+                body = _dechunk(body)
+            with self._lock:
+                self.objects[name] = body
+            return 200, {'ETag': '"etag"'}, b''
+        if operation == 'DeleteObject':
+            with self._lock:
+                self.objects.pop(name, None)
+            return 204, {}, b''
+        with self._lock:
+            content = self.objects.get(name)
+        if content is None:
+            return 404, {}, b''
+        if operation == 'HeadObject':
+            return 200, {'Content-Length': str(len(content)), 'ETag': '"etag"'}, b''
+        return 200, {'ETag': '"etag"'}, content
+
+    def _dynamodb(self, operation: str, request: Any, body: bytes) -> Tuple[int, dict, bytes]:
+        params = json.loads(body)
+        if operation == 'GetItem':
+            response: dict = {'Item': params['Key']}
+        else:
+            response = {
+                'Responses': {table: items['Keys'] for table, items in params['RequestItems'].items()},
+                'UnprocessedKeys': {}}
+        return 200, {'Content-Type': 'application/x-amz-json-1.0'}, json.dumps(response).encode('utf-8')
+
+    def _sns(self, operation: str, request: Any, body: bytes) -> Tuple[int, dict, bytes]:
+        params = urllib.parse.parse_qs(body.decode('utf-8'))
+        if operation == 'Publish':
+            result = f'<MessageId>{uuid.uuid4()}</MessageId>'
+        else:
+            ids = [
+                values[0] for name, values in params.items()
+                if name.startswith('PublishBatchRequestEntries.member.') and name.endswith('.Id')]
+            members = ''.join(f'<member><Id>{id}</Id><MessageId>{uuid.uuid4()}</MessageId></member>' for id in ids)
+            result = f'<Successful>{members}</Successful><Failed/>'
+        content = (
+            f'<{operation}Response xmlns="http://sns.amazonaws.com/doc/2010-03-31/">'
+            f'<{operation}Result>{result}</{operation}Result>'
+            f'<ResponseMetadata><RequestId>{uuid.uuid4()}</RequestId></ResponseMetadata>'
+            f'</{operation}Response>')
+        return 200, {'Content-Type': 'text/xml'}, content.encode('utf-8')
+
+    def _ssm(self, operation: str, request: Any, body: bytes) -> Tuple[int, dict, bytes]:
+        params = json.loads(body)
+
+        def parameter(name):
+            return {'Name': name, 'Type': 'SecureString', 'Value': f'value:{name}', 'Version': 1}
+
+        if operation == 'GetParameter':
+            response: dict = {'Parameter': parameter(params['Name'])}
+        else:
+            response = {'Parameters': [parameter(name) for name in params['Names']], 'InvalidParameters': []}
+        return 200, {'Content-Type': 'application/x-amz-json-1.1'}, json.dumps(response).encode('utf-8')
+
+
+def simulate(latency: float = 0.01, bandwidth: Optional[float] = None) -> Endpoint:
+    """Answers all the requests of the clients created by astromech with a simulated endpoint.
+
+    Also sets dummy credentials and a region, unless they are set already, since requests are still signed.
+
+    Args:
+        latency: See `Endpoint`.
+        bandwidth: See `Endpoint`.
+
+    Returns:
+        The endpoint.
+    """
+    for name, value in (
+            ('AWS_ACCESS_KEY_ID', 'bench'), ('AWS_SECRET_ACCESS_KEY', 'bench'), ('AWS_DEFAULT_REGION', 'us-east-1')):
+        os.environ.setdefault(name, value)
+    endpoint = Endpoint(latency, bandwidth)
+    clients.on_client_created(endpoint.install)
+    return endpoint
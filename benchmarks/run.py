@@ -0,0 +1,129 @@
+"""Runs the benchmark suite offline, against a simulated AWS endpoint.
+
+Reports, for each case: throughput, median and maximum latency, requests per iteration and peak memory.
+
+To compare two commits, save the results of one as a baseline, and compare the other against it:
+```
+git checkout main && python benchmarks/run.py --save benchmarks/baseline.json
+git checkout my-branch && python benchmarks/run.py --compare benchmarks/baseline.json
+```
+With `--compare`, the exit status is 1 if the throughput of any case dropped by more than the tolerance.
+
+Run with: make bench
+"""
+import argparse
+import datetime
+import importlib
+import json
+import platform
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+import endpoint
+from suite import measure
+
+MODULES = ('s3', 'dynamodb', 'sns', 'sqs', 'ssm')
+"""The benchmark modules, as in `bench_[module].py`."""
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metadata(args: argparse.Namespace) -> dict:
+    import botocore
+    return {
+        'commit': _commit(),
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'botocore': botocore.__version__,
+        'latency_ms': args.latency,
+        'bandwidth_mbps': args.bandwidth,
+        'repeat': args.repeat}
+
+
+def _change(new: float, old: float) -> float:
+    return (new - old) / old if old else 0.0
+
+
+def _report(results: Dict[str, dict], baseline: Optional[dict], tolerance: float) -> List[str]:
+    """Prints the results as a table, and returns the names of the cases that regressed."""
+    width = max(len(name) for name in results)
+    header = f'{"case":<{width}}  {"items/s":>10}  {"p50 ms":>9}  {"max ms":>9}  {"req/iter":>8}  {"peak KiB":>9}'
+    if baseline:
+        header += f'  {"Δ items/s":>9}  {"Δ p50":>7}'
+    print(header)
+    print('-' * len(header))
+    regressions = []
+    for name, result in results.items():
+        line = (
+            f'{name:<{width}}  {result["throughput"]:>10,.1f}  {result["p50_ms"]:>9.2f}  {result["max_ms"]:>9.2f}  '
+            f'{result["requests"]:>8.1f}  {result["peak_kib"]:>9,.0f}')
+        old = baseline['results'].get(name) if baseline else None
+        if old:
+            throughput = _change(result['throughput'], old['throughput'])
+            line += f'  {throughput:>+9.1%}  {_change(result["p50_ms"], old["p50_ms"]):>+7.1%}'
+            if throughput < -tolerance:
+                regressions.append(name)
+                line += '  REGRESSION'
+        print(line)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('modules', nargs='*', help=f'The modules to benchmark: {", ".join(MODULES)} (default: all).')
+    parser.add_argument('-k', '--filter', default='', help='Only run the cases whose name contains this string.')
+    parser.add_argument('--latency', type=float, default=5, help='The simulated request latency, in ms.')
+    parser.add_argument('--bandwidth', type=float, help='The simulated bandwidth, in MB/s (default: unlimited).')
+    parser.add_argument('--repeat', type=int, default=20, help='The default number of timed iterations per case.')
+    parser.add_argument('--save', metavar='PATH', help='Save the results as a baseline JSON file.')
+    parser.add_argument('--compare', metavar='PATH', help='Compare the results to a baseline JSON file.')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.2,
+        help='The drop in throughput, as a fraction, over which a case counts as a regression (default: 0.2).')
+    args = parser.parse_args(argv)
+    unknown = set(args.modules) - set(MODULES)
+    if unknown:
+        parser.error(f'Unknown modules: {", ".join(sorted(unknown))}')
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        settings = {'latency_ms': args.latency, 'bandwidth_mbps': args.bandwidth, 'repeat': args.repeat}
+        if any(baseline['meta'].get(name) != value for name, value in settings.items()):
+            print('Warning: the baseline was recorded with different settings:', baseline['meta'], file=sys.stderr)
+
+    simulated = endpoint.simulate(args.latency / 1000, args.bandwidth * 1e6 if args.bandwidth else None)
+    results = {}
+    for module in args.modules or MODULES:
+        for case in importlib.import_module(f'bench_{module}').cases():
+            if args.filter in case.name:
+                results[case.name] = measure(case, simulated, args.repeat)
+    if not results:
+        print('No cases matched.', file=sys.stderr)
+        return 1
+
+    print(f'Simulated latency: {args.latency} ms, bandwidth: {args.bandwidth or "unlimited"} MB/s')
+    if baseline:
+        print(f'Baseline: {baseline["meta"].get("commit")} from {baseline["meta"].get("date")}')
+    regressions = _report(results, baseline, args.tolerance)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'meta': _metadata(args), 'results': results}, f, indent=4)
+            f.write('\n')
+    if regressions:
+        print(f'\n{len(regressions)} regression(s): {", ".join(regressions)}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
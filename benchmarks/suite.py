@@ -0,0 +1,76 @@
+"""The building blocks of the benchmark suite: benchmark cases, and measuring them.
+
+Each `bench_[module].py` file defines a `cases()` function that returns a list of `Case`. The cases call astromech
+functions, whose requests are answered by the simulated endpoint from `endpoint.py`.
+"""
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from endpoint import Endpoint
+
+
+class Case(NamedTuple):
+    """A single benchmark.
+
+    Attributes:
+        name: A unique name, used to match results against the baseline.
+        func: Runs one iteration of the benchmark.
+        items: The number of items (objects, messages, keys...) that each iteration processes. Throughput is
+            reported in items per second.
+        repeat: The number of timed iterations. Overrides the suite's default, for slow cases.
+        setup: Called once before the iterations.
+        teardown: Called once after the iterations, even if they failed.
+    """
+
+    name: str
+    func: Callable[[], Any]
+    items: int = 1
+    repeat: Optional[int] = None
+    setup: Optional[Callable[[], Any]] = None
+    teardown: Optional[Callable[[], Any]] = None
+
+
+def measure(case: Case, endpoint: Endpoint, repeat: int) -> Dict[str, float]:
+    """Runs a benchmark case.
+
+    The case runs once untimed first, to warm up clients and caches. Then it runs `repeat` timed iterations, and one
+    more iteration under `tracemalloc` to measure its peak memory, which is kept separate since tracing slows
+    everything down.
+
+    Returns:
+        The results:
+        - "throughput": Items per second.
+        - "p50_ms", "max_ms": The median and the maximum iteration latency, in milliseconds. Slow cases only run a
+          few iterations, too few for meaningful high percentiles, so the maximum is reported instead.
+        - "requests": The average number of requests per iteration.
+        - "peak_kib": The peak memory allocated during an iteration, in KiB.
+    """
+    repeat = case.repeat or repeat
+    if case.setup:
+        case.setup()
+    try:
+        case.func()
+        requests = endpoint.requests
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            case.func()
+            times.append(time.perf_counter() - start)
+        requests = endpoint.requests - requests
+        tracemalloc.start()
+        try:
+            case.func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    finally:
+        if case.teardown:
+            case.teardown()
+    return {
+        'throughput': case.items * repeat / sum(times),
+        'p50_ms': statistics.median(times) * 1000,
+        'max_ms': max(times) * 1000,
+        'requests': requests / repeat,
+        'peak_kib': peak / 1024}
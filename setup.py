@@ -29,7 +29,10 @@ setuptools.setup(
     packages=setuptools.find_packages(exclude=['tests', 'docs']),
     python_requires='>=3.7',
     install_requires=[
-        'boto3 ~= 1.7'
+        'boto3 ~= 1.26'
     ],
+    extras_require={
+        'fast': ['orjson >= 3.0']
+    },
     setup_requires=['setuptools_scm']
 )
@@ -0,0 +1,148 @@
+import asyncio
+import io
+import json
+import threading
+import time
+
+import botocore.stub
+import pytest
+
+from astromech import aio, clients, s3, sns
+from astromech.aio import dynamodb as adynamodb
+from astromech.aio import s3 as as3
+from astromech.aio import sns as asns
+from astromech.aio import sqs as asqs
+from astromech.aio import ssm as assm
+
+
+@pytest.fixture(autouse=True)
+def executor():
+    yield
+    aio.shutdown()
+
+
+def test_executor(monkeypatch):
+    monkeypatch.setattr(clients, '_settings', {'max_pool_connections': 7})
+    pool = aio.executor()
+    assert pool._max_workers == 7
+    assert aio.executor() is pool
+
+
+def test_run():
+    async def main():
+        caller = threading.get_ident()
+        thread = await aio.run(threading.get_ident)
+        assert thread != caller
+        assert await aio.run(lambda a, b=0: a + b, 1, b=2) == 3
+        with pytest.raises(ZeroDivisionError):
+            await aio.run(lambda: 1 / 0)
+
+    asyncio.run(main())
+
+
+def test_timeout():
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await aio.run(time.sleep, 1, timeout=0.01)
+
+    asyncio.run(main())
+
+
+def test_cancel_pending(monkeypatch):
+    """Calls that are cancelled before they get a thread never run."""
+    monkeypatch.setattr(clients, '_settings', {'max_pool_connections': 1})
+    release = threading.Event()
+    ran = []
+
+    async def main():
+        blocker = asyncio.ensure_future(aio.run(release.wait, 5))
+        pending = asyncio.ensure_future(aio.run(ran.append, 'pending'))
+        await asyncio.sleep(0.01)
+        pending.cancel()
+        await asyncio.sleep(0)  # Let the cancellation reach the thread pool
+        release.set()
+        await blocker
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+
+    asyncio.run(main())
+    assert ran == []
+
+
+def test_wrap():
+    def add(a, b):
+        """Adds."""
+        return a + b
+
+    wrapped = aio.wrap(add)
+    assert wrapped.__name__ == 'add'
+    assert wrapped.__doc__ == 'Adds.'
+    assert asyncio.run(wrapped(1, b=2)) == 3
+
+
+def test_gather():
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def work(i):
+        with lock:
+            running.append(i)
+            peak.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(i)
+        return i * 2
+
+    async def main():
+        return await aio.gather(*(aio.run(work, i) for i in range(20)), limit=3)
+
+    assert asyncio.run(main()) == [i * 2 for i in range(20)]
+    assert max(peak) <= 3
+
+
+def test_gather_exceptions():
+    async def main():
+        return await aio.gather(aio.run(lambda: 1), aio.run(lambda: 1 / 0), return_exceptions=True)
+
+    one, error = asyncio.run(main())
+    assert one == 1
+    assert isinstance(error, ZeroDivisionError)
+
+
+def test_s3():
+    bucket, key, buf = 'test-bucket', 'test-key', b'Lorem ipsum'
+
+    async def main():
+        return await as3.get_bytes(bucket, key), await as3.exists(bucket, key)
+
+    with botocore.stub.Stubber(s3.client()) as stubber:
+        stubber.add_response('get_object', {'Body': io.BytesIO(buf)}, {'Bucket': bucket, 'Key': key})
+        stubber.add_response('head_object', {}, {'Bucket': bucket, 'Key': key})
+        assert asyncio.run(main()) == (buf, True)
+    assert as3.parse_uri('s3://bucket/key') == ('bucket', 'key')
+    s3._client = None
+
+
+def test_sns(context):
+    topic_arn = 'arn:aws:sns:us-east-1:1234567890:test-topic'
+
+    async def main():
+        message_id = await asns.publish(topic_arn, context, {'a': 1}, timeout=5)
+        await asns.flush(timeout=1)
+        return message_id
+
+    with botocore.stub.Stubber(sns.client()) as stubber:
+        stubber.add_response('publish', {'MessageId': 'id-1'})
+        assert asyncio.run(main()) == 'id-1'
+    sns._client = None
+
+
+def test_sqs():
+    event = {'Records': [{'messageId': '0', 'body': json.dumps({'a': 1})}, {'messageId': '1', 'body': 'text'}]}
+    assert asyncio.run(asqs.parse_event(event)) == [{'a': 1}, 'text']
+
+
+def test_modules():
+    for func in (adynamodb.exists, assm.get_param_value, assm.prefetch, assm.prefetch_path, asns.publish_many):
+        assert asyncio.iscoroutinefunction(func)
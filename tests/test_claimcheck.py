@@ -0,0 +1,78 @@
+import gzip
+import io
+
+import botocore.stub
+import pytest
+
+from astromech import claimcheck, s3
+
+
+@pytest.fixture(autouse=True)
+def reset_client():
+    yield
+    s3._client = None
+
+
+@pytest.fixture
+def claim_check_env(monkeypatch):
+    monkeypatch.setenv('CLAIM_CHECK_BUCKET', 'claims-bucket')
+    monkeypatch.setenv('CLAIM_CHECK_KEY_PREFIX', '/claims/')
+    monkeypatch.setenv('CLAIM_CHECK_THRESHOLD', '16')
+    return monkeypatch
+
+
+def test_enabled(monkeypatch):
+    monkeypatch.delenv('CLAIM_CHECK_BUCKET', raising=False)
+    assert not claimcheck.enabled()
+    assert claimcheck.offload('x' * (claimcheck.THRESHOLD + 1)) is None
+    monkeypatch.setenv('CLAIM_CHECK_BUCKET', 'claims-bucket')
+    assert claimcheck.enabled()
+
+
+def test_threshold(monkeypatch):
+    monkeypatch.delenv('CLAIM_CHECK_THRESHOLD', raising=False)
+    assert claimcheck.threshold() == claimcheck.THRESHOLD
+    monkeypatch.setenv('CLAIM_CHECK_THRESHOLD', '1000')
+    assert claimcheck.threshold() == 1000
+
+
+@pytest.mark.parametrize('compress', ['false', 'true'])
+def test_offload(claim_check_env, compress):
+    claim_check_env.setenv('CLAIM_CHECK_COMPRESS', compress)
+    message = '{"key": "a value that is longer than the threshold"}'
+    assert claimcheck.offload('{"short": 1}') is None
+    body = gzip.compress(message.encode()) if compress == 'true' else message.encode()
+    expected_params = {
+        'Bucket': 'claims-bucket', 'Key': botocore.stub.ANY, 'Body': botocore.stub.ANY, 'Tagging': '',
+        'ACL': 'private'}
+    with botocore.stub.Stubber(s3.client()) as stubber:
+        stubber.add_response('put_object', {}, expected_params)
+        uri = claimcheck.offload(message)
+        bucket, key = s3.parse_uri(uri)
+        assert bucket == 'claims-bucket'
+        assert key.startswith('claims/')
+        assert key.endswith('.json.gz' if compress == 'true' else '.json')
+        stubber.add_response('get_object', {'Body': io.BytesIO(body)}, {'Bucket': bucket, 'Key': key})
+        assert claimcheck.fetch(uri) == message
+
+
+def test_delete(claim_check_env):
+    with botocore.stub.Stubber(s3.client()) as stubber:
+        stubber.add_response('delete_object', {}, {'Bucket': 'claims-bucket', 'Key': 'claims/1.json'})
+        claimcheck.delete('s3://claims-bucket/claims/1.json')
+
+
+def test_owns(claim_check_env):
+    assert claimcheck.owns('s3://claims-bucket/claims/1.json')
+    assert not claimcheck.owns('s3://claims-bucket/other/1.json')
+    assert not claimcheck.owns('s3://claims-bucket/claims-other/1.json')
+    assert not claimcheck.owns('s3://prod-secrets/claims/db.json')
+    assert not claimcheck.owns('https://claims-bucket/claims/1.json')
+    with pytest.raises(ValueError):
+        claimcheck.fetch('s3://prod-secrets/db.json')
+    with pytest.raises(ValueError):
+        claimcheck.delete('s3://prod-secrets/db.json')
+    claim_check_env.delenv('CLAIM_CHECK_KEY_PREFIX')
+    assert claimcheck.owns('s3://claims-bucket/1.json')
+    claim_check_env.delenv('CLAIM_CHECK_BUCKET')
+    assert not claimcheck.owns('s3://claims-bucket/1.json')
@@ -0,0 +1,170 @@
+import threading
+import time
+
+import boto3
+import botocore.awsrequest
+import botocore.client
+import botocore.endpoint
+import pytest
+
+import astromech
+from astromech import clients, dynamodb, s3, sqs, ssm
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    monkeypatch.setattr(clients, '_settings', {})
+    for name in ('MAX_POOL_CONNECTIONS', 'TCP_KEEPALIVE', 'RETRY_MODE', 'MAX_ATTEMPTS'):
+        monkeypatch.delenv(f'ASTROMECH_{name}', raising=False)
+    return monkeypatch
+
+
+def test_session():
+    session = clients.session()
+    assert isinstance(session, boto3.session.Session)
+    assert clients.session() is session
+
+
+def test_config_defaults(settings):
+    config = clients.config()
+    assert config.max_pool_connections == 50
+    assert config.tcp_keepalive is True
+    assert config.retries == {'mode': 'adaptive', 'total_max_attempts': 3}
+
+
+def test_config_env(settings):
+    settings.setenv('ASTROMECH_MAX_POOL_CONNECTIONS', '100')
+    settings.setenv('ASTROMECH_TCP_KEEPALIVE', 'false')
+    settings.setenv('ASTROMECH_RETRY_MODE', 'standard')
+    settings.setenv('ASTROMECH_MAX_ATTEMPTS', '5')
+    config = clients.config()
+    assert config.max_pool_connections == 100
+    assert config.tcp_keepalive is False
+    assert config.retries == {'mode': 'standard', 'total_max_attempts': 5}
+    # configure() takes precedence over the env, and leaves the other settings alone
+    clients.configure(max_pool_connections=20, retry_mode='adaptive')
+    config = clients.config()
+    assert config.max_pool_connections == 20
+    assert config.retries == {'mode': 'adaptive', 'total_max_attempts': 5}
+
+
+def test_client(settings):
+    clients.configure(max_pool_connections=25)
+    client = clients.client('sqs')
+    assert isinstance(client, botocore.client.BaseClient)
+    assert client.meta.config.max_pool_connections == 25
+    assert client.meta.config.retries['mode'] == 'adaptive'
+    assert clients.client('sqs') is not client
+
+
+def test_max_attempts(settings):
+    settings.setattr(botocore.endpoint.time, 'sleep', lambda seconds: None)
+    clients.configure(retry_mode='standard', max_attempts=3)
+    client = clients.client('ssm')
+    attempts = []
+
+    class Raw:
+        def stream(self, *args, **kwargs):
+            yield b'{}'
+
+    def before_send(request, **kwargs):
+        attempts.append(request)
+        return botocore.awsrequest.AWSResponse(request.url, 500, {}, Raw())
+
+    client.meta.events.register('before-send', before_send)
+    with pytest.raises(botocore.client.ClientError):
+        client.get_parameter(Name='/p')
+    # The first attempt counts towards max_attempts
+    assert len(attempts) == 3
+
+
+def test_localstack_client(monkeypatch):
+    localstack_url = 'http://localhost:4576'
+    monkeypatch.setenv('LOCALSTACK_SQS_URL', localstack_url)
+    assert clients.client('sqs').meta.endpoint_url == localstack_url
+    monkeypatch.setenv('LOCALSTACK_DYNAMODB_URL', localstack_url)
+    assert clients.resource('dynamodb').meta.client.meta.endpoint_url == localstack_url
+
+
+def test_concurrent_initialization(monkeypatch):
+    """Tests that threads racing to initialize a module's client all get the same one."""
+    created = []
+    create = clients.client
+    monkeypatch.setattr(clients, 'client', lambda service: created.append(service) or create(service))
+    barrier = threading.Barrier(8)
+    results = []
+
+    def initialize():
+        barrier.wait()
+        results.append(s3.client())
+
+    threads = [threading.Thread(target=initialize) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert created == ['s3']
+    assert all(client is results[0] for client in results)
+    s3._client = None
+
+
+@pytest.fixture
+def reset_clients():
+    yield
+    s3._client = None
+    sqs._client = None
+    ssm._client = None
+    dynamodb._resource = None
+    dynamodb._table = None
+
+
+def test_warmup(reset_clients, monkeypatch):
+    connected = []
+    monkeypatch.setattr(clients, '_connect', lambda client: connected.append(client))
+    monkeypatch.setenv('DYNAMODB_TABLE', 'test-table')
+    timings = astromech.warmup(['s3', 'sqs', 'dynamodb'], connect=True)
+    assert set(timings) == {'s3', 's3.connect', 'sqs', 'sqs.connect', 'dynamodb', 'dynamodb.connect', 'total'}
+    assert all(seconds >= 0 for seconds in timings.values())
+    assert s3._client is not None and sqs._client is not None
+    assert dynamodb._table is not None
+    assert ssm._client is None
+    assert sorted(id(client) for client in connected) == sorted(
+        id(client) for client in (s3._client, sqs._client, dynamodb.client()))
+
+
+def test_warmup_ssm_params(reset_clients, monkeypatch):
+    prefetched = []
+    monkeypatch.setattr(ssm, 'prefetch', lambda *args: prefetched.append(args))
+    timings = astromech.warmup(['ssm'], ssm_params=['/p1', '/p2'], ssm_ttl=60)
+    assert set(timings) == {'ssm', 'ssm.params', 'total'}
+    assert prefetched == [(['/p1', '/p2'], True, 60)]
+
+
+def test_warmup_timings_exclude_waiting(reset_clients, monkeypatch):
+    client = clients.client
+
+    def slow_client(service):
+        time.sleep(0.1)
+        return client(service)
+
+    monkeypatch.setattr(clients, 'client', slow_client)
+    timings = astromech.warmup(['s3', 'sqs', 'ssm'])
+    # The clients are created one at a time, so their own times add up to no more than the total
+    assert all(timings[service] >= 0.1 for service in ('s3', 'sqs', 'ssm'))
+    assert timings['s3'] + timings['sqs'] + timings['ssm'] <= timings['total']
+
+
+def test_warmup_unknown_service():
+    with pytest.raises(ValueError):
+        astromech.warmup(['s3', 'ec2'])
+
+
+def test_warmup_ssm_params_without_ssm():
+    with pytest.raises(ValueError):
+        astromech.warmup(['s3'], ssm_params=['/p'])
+
+
+def test_connect(reset_clients, monkeypatch):
+    """Pre-connecting to an endpoint that isn't listening is harmless."""
+    monkeypatch.setenv('LOCALSTACK_S3_URL', 'http://localhost:1')
+    clients._connect(s3.client())
@@ -0,0 +1,50 @@
+"""Import-time budgets for the astromech modules.
+
+Each module is imported in a fresh interpreter under `python -X importtime`, and its cumulative import time
+(including everything it imports) is compared with the budget recorded in data/import_budget.json, in
+microseconds. Timings are noisy, so a module gets a few attempts to come in under budget.
+
+The budgets are absolute wall-clock times, so they only hold on a machine like the one they were recorded on.
+They are checked only when the environment variable "ASTROMECH_IMPORT_BUDGETS" is set, e.g. with
+`make import-time`. The check that importing a module doesn't import boto3 always runs.
+"""
+import json
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+BUDGETS = json.loads((pathlib.Path(__file__).parent / 'data' / 'import_budget.json').read_text())
+ATTEMPTS = 3
+
+
+def import_time(module):
+    """Returns the cumulative import time of a module in a fresh interpreter, in microseconds."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and line.split('|')[-1].strip() == module:
+            return int(line.split('|')[1])
+    raise AssertionError(f'No import time reported for {module}')
+
+
+@pytest.mark.skipif(
+    not os.environ.get('ASTROMECH_IMPORT_BUDGETS'), reason='Set ASTROMECH_IMPORT_BUDGETS to check import times')
+@pytest.mark.parametrize('module', sorted(BUDGETS))
+def test_import_time(module):
+    timings = []
+    for _ in range(ATTEMPTS):
+        timings.append(import_time(module))
+        if timings[-1] <= BUDGETS[module]:
+            return
+    pytest.fail(f'Importing {module} took {min(timings)}us, over its budget of {BUDGETS[module]}us')
+
+
+@pytest.mark.parametrize('module', sorted(BUDGETS))
+def test_no_eager_boto(module):
+    code = f'import sys, {module}; print(sorted(m for m in ("boto3", "botocore") if m in sys.modules))'
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
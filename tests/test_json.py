@@ -0,0 +1,45 @@
+import json
+import math
+
+import pytest
+
+from astromech import json as ajson
+
+
+@pytest.mark.parametrize('s, expected', [
+    ('{"key": "Value"}', {'key': 'Value'}),
+    ('  [1, 2, 3]', [1, 2, 3]),
+    ('-17', -17),
+    ('null', None),
+    ('123456789012345678901234567890', 123456789012345678901234567890),
+    ('Infinity', float('inf')),
+    ('Hello from SQS!', 'Hello from SQS!'),
+    ('not JSON after all', 'not JSON after all'),
+    ('{broken', '{broken'),
+    ('', '')])
+def test_loads_or_raw(s, expected):
+    assert ajson.loads_or_raw(s) == expected
+
+
+def test_loads_or_raw_nan():
+    assert math.isnan(ajson.loads_or_raw('NaN'))
+
+
+def test_loads():
+    assert ajson.loads('{"key": "Value"}') == {'key': 'Value'}
+    with pytest.raises(ValueError):
+        ajson.loads('Hello')
+
+
+def test_set_backend(monkeypatch):
+    monkeypatch.setattr(ajson, '_loads', ajson._loads)
+    calls = []
+
+    def loads(s):
+        calls.append(s)
+        return json.loads(s)
+
+    ajson.set_backend(loads)
+    assert ajson.loads_or_raw('{"a": 1}') == {'a': 1}
+    assert ajson.loads_or_raw('plain text') == 'plain text'
+    assert calls == ['{"a": 1}']
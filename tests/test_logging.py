@@ -0,0 +1,92 @@
+import io
+import json
+import logging
+
+import pytest
+
+from astromech import logging as alogging
+from astromech.logging import logger
+
+
+@pytest.fixture
+def stream():
+    handlers, propagate, level = list(logger.handlers), logger.propagate, logger.level
+    yield io.StringIO()
+    alogging.shutdown()
+    logger.handlers = handlers
+    logger.propagate = propagate
+    logger.setLevel(level)
+
+
+class Counted:
+    """Counts how many times it gets formatted."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __str__(self):
+        self.count += 1
+        return 'counted'
+
+
+def test_logger():
+    assert logger.name == 'astromech'
+    assert logging.getLogger().level == logging.WARNING
+
+
+def test_structured(stream):
+    alogging.configure(stream=stream)
+    logger.setLevel(logging.INFO)
+    logger.info('Read %d bytes from %s', 42, 's3://bucket/key', extra={'request_id': 'abc', 'data': {1, 2}})
+    entry = json.loads(stream.getvalue())
+    assert entry['message'] == 'Read 42 bytes from s3://bucket/key'
+    assert entry['level'] == 'INFO'
+    assert entry['logger'] == 'astromech'
+    assert entry['request_id'] == 'abc'
+    assert entry['data'] == '{1, 2}'
+    assert entry['timestamp'].endswith('Z')
+    assert not logger.propagate
+
+
+def test_structured_exception(stream):
+    alogging.configure(stream=stream)
+    try:
+        raise ValueError('Oops')
+    except ValueError:
+        logger.exception('Failed')
+    entry = json.loads(stream.getvalue())
+    assert entry['level'] == 'ERROR'
+    assert 'ValueError: Oops' in entry['exception']
+
+
+def test_plain(stream):
+    alogging.configure(structured=False, stream=stream)
+    logger.warning('Hello %s', 'world')
+    assert stream.getvalue().rstrip().endswith('WARNING astromech Hello world')
+
+
+def test_lazy_formatting(stream):
+    alogging.configure(stream=stream)
+    logger.setLevel(logging.INFO)
+    counted = Counted()
+    logger.debug('Not formatted: %s', counted)
+    assert counted.count == 0
+    assert stream.getvalue() == ''
+    logger.info('Formatted: %s', counted)
+    assert counted.count == 1
+
+
+def test_queue(stream):
+    alogging.configure(use_queue=True, stream=stream)
+    logger.setLevel(logging.INFO)
+    counted = Counted()
+    for i in range(100):
+        logger.info('Message %d %s', i, counted)
+    alogging.flush()
+    lines = stream.getvalue().splitlines()
+    assert [json.loads(line)['message'] for line in lines] == [f'Message {i} counted' for i in range(100)]
+    # Still running after the flush
+    logger.info('One more')
+    alogging.shutdown()
+    assert json.loads(stream.getvalue().splitlines()[-1])['message'] == 'One more'
+    assert alogging._listener is None
@@ -0,0 +1,180 @@
+import io
+import json
+
+import botocore.awsrequest
+import botocore.endpoint
+import botocore.stub
+import pytest
+
+from astromech import clients, metrics, s3
+
+
+class Raw(io.BytesIO):
+    """A stand-in for the urllib3 response that botocore reads the body from, or streams it."""
+
+    def stream(self, *args, **kwargs):
+        yield self.read()
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(clients, '_hooks', [])
+    monkeypatch.setattr(metrics, '_enabled', False)
+    monkeypatch.setattr(metrics, '_stats', {})
+    monkeypatch.setattr(botocore.endpoint.time, 'sleep', lambda seconds: None)
+    monkeypatch.delenv('AWS_LAMBDA_FUNCTION_NAME', raising=False)
+    metrics.enable()
+
+
+def respond(client, *responses):
+    """Makes the client answer requests with the given (status, body) responses, without sending them."""
+    responses = list(responses)
+
+    def before_send(request, **kwargs):
+        status, body = responses.pop(0)
+        body = json.dumps(body).encode()
+        headers = {'Content-Length': str(len(body)), 'Content-Type': 'application/x-amz-json-1.1'}
+        return botocore.awsrequest.AWSResponse(request.url, status, headers, Raw(body))
+
+    client.meta.events.register('before-send', before_send)
+
+
+def test_metrics(enabled):
+    client = clients.client('ssm')
+    parameter = {'Parameter': {'Name': '/p', 'Type': 'String', 'Value': 'v', 'Version': 1}}
+    throttled = {'__type': 'ThrottlingException', 'message': 'Rate exceeded'}
+    respond(client, (200, parameter), (400, throttled), (200, parameter))
+    client.get_parameter(Name='/p')
+    client.get_parameter(Name='/p')
+    stats = metrics.snapshot()[('ssm', 'GetParameter')]
+    assert stats['Calls'] == 2
+    assert stats['Errors'] == 0
+    assert stats['Retries'] == 1
+    assert stats['Throttles'] == 1
+    # Retried requests are sent again, and count again
+    assert stats['RequestBytes'] == 3 * len(json.dumps({'Name': '/p'}))
+    assert stats['ResponseBytes'] == 2 * len(json.dumps(parameter))
+    assert len(stats['Latency']) == 2
+
+
+def test_all_attempts_throttled(enabled, monkeypatch):
+    # The adaptive mode's client-side rate limiter would slow the test down
+    monkeypatch.setattr(clients, '_settings', {'retry_mode': 'standard'})
+    client = clients.client('ssm')
+    throttled = {'__type': 'ThrottlingException', 'message': 'Rate exceeded'}
+    respond(client, *[(400, throttled)] * 10)
+    with pytest.raises(client.exceptions.ClientError):
+        client.get_parameter(Name='/p')
+    stats = metrics.snapshot()[('ssm', 'GetParameter')]
+    assert stats['Errors'] == 1
+    assert stats['Retries'] > 0
+    # Every attempt was throttled, and each is counted once
+    assert stats['Throttles'] == stats['Retries'] + 1
+
+
+def test_s3_bytes(enabled, monkeypatch):
+    monkeypatch.setattr(s3, '_client', None)
+    size = 5_000_000
+    client = s3.client()
+
+    def before_send(request, event_name, **kwargs):
+        operation = event_name.split('.')[-1]
+        # Like S3, HeadObject returns the size of the object, but no body
+        headers = {'Content-Length': str(size)} if operation in ('HeadObject', 'GetObject') else {}
+        body = b'x' * size if operation == 'GetObject' else b''
+        return botocore.awsrequest.AWSResponse(request.url, 200, headers, Raw(body))
+
+    client.meta.events.register('before-send', before_send)
+    s3.put_bytes(b'x' * 100000, 'bucket', 'key')
+    client.put_object(Bucket='bucket', Key='key', Body=io.BytesIO(b'x' * 1000))
+    assert s3.exists('bucket', 'key')
+    assert len(s3.get_bytes('bucket', 'key')) == size
+    stats = metrics.snapshot()
+    # Uploads are streamed, aws-chunked, and still counted
+    assert stats[('s3', 'PutObject')]['RequestBytes'] == 101000
+    assert stats[('s3', 'HeadObject')]['ResponseBytes'] == 0
+    assert stats[('s3', 'GetObject')]['ResponseBytes'] == size
+    s3._client = None
+
+
+def test_request_bytes():
+    class Request:
+        headers = {}
+
+        def __init__(self, body):
+            self.body = body
+
+    assert metrics._request_bytes(Request(None)) == 0
+    assert metrics._request_bytes(Request(b'12345')) == 5
+    body = io.BytesIO(b'1234567890')
+    body.seek(4)
+    # Only what's left to send counts, and the position is kept
+    assert metrics._request_bytes(Request(body)) == 6
+    assert body.tell() == 4
+    assert metrics._request_bytes(Request(iter([b'123']))) == 0
+
+
+def test_errors(enabled):
+    client = clients.client('ssm')
+    with botocore.stub.Stubber(client) as stubber:
+        stubber.add_client_error('get_parameter', 'ParameterNotFound')
+        with pytest.raises(client.exceptions.ParameterNotFound):
+            client.get_parameter(Name='/p')
+    stats = metrics.snapshot()[('ssm', 'GetParameter')]
+    assert (stats['Calls'], stats['Errors']) == (1, 1)
+
+
+def test_existing_clients_are_instrumented(monkeypatch):
+    monkeypatch.setattr(clients, '_hooks', [])
+    monkeypatch.setattr(metrics, '_enabled', False)
+    monkeypatch.setattr(metrics, '_stats', {})
+    client = clients.client('ssm')
+    metrics.enable()
+    metrics.enable()
+    with botocore.stub.Stubber(client) as stubber:
+        stubber.add_response('get_parameter', {'Parameter': {'Name': '/p', 'Value': 'v'}})
+        client.get_parameter(Name='/p')
+    assert metrics.snapshot()[('ssm', 'GetParameter')]['Calls'] == 1
+
+
+def test_flush(enabled, monkeypatch):
+    monkeypatch.setenv('AWS_LAMBDA_FUNCTION_NAME', 'TestFunction')
+    metrics._record('s3', 'GetObject', Calls=1, Latency=12.5, ResponseBytes=1024)
+    metrics._record('s3', 'GetObject', Calls=1, Latency=7.5, ResponseBytes=1024)
+    stream = io.StringIO()
+    metrics.flush(stream)
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1
+    document = json.loads(lines[0])
+    assert document['s3.GetObject.Calls'] == 2
+    assert document['s3.GetObject.Latency'] == [12.5, 7.5]
+    assert document['s3.GetObject.ResponseBytes'] == 2048
+    assert document['FunctionName'] == 'TestFunction'
+    directive, = document['_aws']['CloudWatchMetrics']
+    assert directive['Namespace'] == 'Astromech'
+    assert directive['Dimensions'] == [['FunctionName']]
+    assert {'Name': 's3.GetObject.Latency', 'Unit': 'Milliseconds'} in directive['Metrics']
+    # Nothing left to flush
+    metrics.flush(stream)
+    assert len(stream.getvalue().splitlines()) == 1
+    assert metrics.snapshot() == {}
+
+
+def test_flush_many_operations(enabled):
+    for i in range(20):
+        metrics._record('s3', f'Operation{i}', Calls=1)
+    stream = io.StringIO()
+    metrics.flush(stream)
+    directives = json.loads(stream.getvalue())['_aws']['CloudWatchMetrics']
+    assert [len(directive['Metrics']) for directive in directives] == [100, 40]
+    assert directives[0]['Dimensions'] == [[]]
+
+
+def test_flush_on_return(enabled, capsys):
+    @metrics.flush_on_return
+    def handler(event, context):
+        metrics._record('sns', 'Publish', Calls=1)
+        return event
+
+    assert handler('event', None) == 'event'
+    assert json.loads(capsys.readouterr().out)['sns.Publish.Calls'] == 1
@@ -130,3 +130,9 @@ def test_put_bytes(bucket, key):
         expected_params['ACL'] = acl
         stubber.add_response('put_object', service_response, expected_params)
         assert s3.put_bytes(buf, bucket, key, tags, acl) == (bucket, key, len(buf))
+
+
+def test_delete(bucket, key):
+    with botocore.stub.Stubber(s3.client()) as stubber:
+        stubber.add_response('delete_object', {}, {'Bucket': bucket, 'Key': key})
+        s3.delete(bucket, key)
@@ -0,0 +1,165 @@
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+from astromech import dynamodb, s3, singleflight, ssm
+
+
+@pytest.fixture
+def enabled():
+    singleflight.enable()
+    singleflight.reset_stats()
+    yield
+    singleflight.disable()
+    singleflight.reset_stats()
+
+
+class Blocking:
+    """A function that blocks until released, and counts its calls."""
+
+    def __init__(self, value=None):
+        self.value = value
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if isinstance(self.value, Exception):
+            raise self.value
+        return self.value
+
+
+def run_concurrently(func, n=5):
+    """Calls `func` on `n` threads, and returns the futures once they all are waiting."""
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=n)
+    futures = [executor.submit(func) for _ in range(n)]
+    executor.shutdown(wait=False)
+    return futures
+
+
+def test_group_do():
+    group = singleflight.Group()
+    func = Blocking('result')
+    futures = run_concurrently(lambda: group.do('key', func))
+    assert func.started.wait(5)
+    time.sleep(0.05)
+    assert group.in_flight('key')
+    func.release.set()
+    assert [future.result() for future in futures] == ['result'] * 5
+    assert func.calls == 1
+    assert group.stats() == {'calls': 5, 'saved': 4}
+    assert not group.in_flight('key')
+    # Once the call is done, the next one runs again
+    assert group.do('key', func) == 'result'
+    assert func.calls == 2
+    group.reset_stats()
+    assert group.stats() == {'calls': 0, 'saved': 0}
+
+
+def test_group_do_shares_errors():
+    group = singleflight.Group()
+    error = KeyError('missing')
+    func = Blocking(error)
+    futures = run_concurrently(lambda: group.do('key', func))
+    assert func.started.wait(5)
+    time.sleep(0.05)
+    func.release.set()
+    assert all(future.exception() is error for future in futures)
+    assert func.calls == 1
+    assert not group.in_flight('key')
+
+
+def test_group_do_different_keys():
+    group = singleflight.Group()
+    assert group.do('a', lambda x: x * 2, 1) == 2
+    assert group.do('b', lambda x, y: x + y, 1, y=2) == 3
+    assert group.stats() == {'calls': 2, 'saved': 0}
+
+
+def test_coalesce_disabled():
+    func = Blocking('result')
+    func.release.set()
+
+    @singleflight.coalesce()
+    def coalesced(arg):
+        return func(arg)
+
+    assert not singleflight.enabled()
+    assert [future.result() for future in run_concurrently(lambda: coalesced('a'))] == ['result'] * 5
+    assert func.calls == 5
+    assert singleflight.stats() == {'calls': 0, 'saved': 0}
+
+
+def test_coalesce_key(enabled):
+    calls = []
+
+    @singleflight.coalesce(lambda item: item['id'])
+    def load(item):
+        calls.append(item)
+        return item['id']
+
+    assert load({'id': 1}) == 1
+    assert load({'id': 2}) == 2
+    assert len(calls) == 2
+
+
+def test_s3_get_bytes(enabled, monkeypatch):
+    class Body:
+        def read(self):
+            return b'data'
+
+    func = Blocking({'Body': Body()})
+
+    class FakeClient:
+        get_object = func
+
+    monkeypatch.setattr(s3, 'client', lambda: FakeClient)
+    futures = run_concurrently(lambda: s3.get_bytes('bucket', 'key'))
+    assert func.started.wait(5)
+    time.sleep(0.05)
+    func.release.set()
+    assert [future.result() for future in futures] == [b'data'] * 5
+    assert func.calls == 1
+    assert singleflight.stats() == {'calls': 5, 'saved': 4}
+    # A different object is a different call
+    assert s3.get_bytes('bucket', 'other-key') == b'data'
+    assert func.calls == 2
+
+
+def test_dynamodb_exists(enabled, monkeypatch):
+    func = Blocking({'Item': {'Id': '12345'}})
+
+    class FakeTable:
+        get_item = func
+
+    monkeypatch.setattr(dynamodb, 'table', lambda: FakeTable)
+    futures = run_concurrently(lambda: dynamodb.exists({'Id': '12345'}))
+    assert func.started.wait(5)
+    time.sleep(0.05)
+    func.release.set()
+    assert all(future.result() for future in futures)
+    assert func.calls == 1
+
+
+def test_ssm_get_param_value(enabled, monkeypatch):
+    func = Blocking({'Parameter': {'Value': 's3cret'}})
+
+    class FakeClient:
+        get_parameter = func
+
+    monkeypatch.setattr(ssm, 'client', lambda: FakeClient)
+    monkeypatch.setattr(ssm, '_cache', {})
+    uncached = run_concurrently(lambda: ssm.get_param_value('/My/Param', True), n=3)
+    cached = run_concurrently(lambda: ssm.get_param_value('/My/Param', True, ttl=60), n=3)
+    assert func.started.wait(5)
+    time.sleep(0.05)
+    func.release.set()
+    assert all(future.result() == 's3cret' for future in uncached + cached)
+    # Uncached lookups are coalesced with each other, but never with cached ones
+    assert func.calls == 2
+    assert list(ssm._cache) == [('/My/Param', True)]
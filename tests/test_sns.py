@@ -2,6 +2,7 @@ import json
 import re
 
 import botocore.client
+import botocore.exceptions
 import botocore.stub
 import pytest
 
@@ -66,3 +67,235 @@ def test_publish_to_bus(context, subject, monkeypatch):
     with botocore.stub.Stubber(sns.client()) as stubber:
         stubber.add_response('publish', {'MessageId': message_id}, expected_params)
         assert sns.publish_to_bus(context, payload, extra_attributes, subject) == message_id
+
+
+def test_publish_claim_check(context, monkeypatch):
+    topic_arn, payload, extra_attributes, message_id, expected_params = params_for_publish(context, None)
+    uri = 's3://claims-bucket/claims/1.json'
+    offloaded = []
+
+    def offload(message):
+        offloaded.append(message)
+        return uri
+
+    monkeypatch.setattr(sns.claimcheck, 'offload', offload)
+    expected_params['Message'] = json.dumps({'claim_check': uri})
+    expected_params['MessageAttributes']['claim_check'] = {'DataType': 'String', 'StringValue': uri}
+    with botocore.stub.Stubber(sns.client()) as stubber:
+        stubber.add_response('publish', {'MessageId': message_id}, expected_params)
+        assert sns.publish(topic_arn, context, payload, extra_attributes) == message_id
+    assert offloaded == [json.dumps(payload)]
+
+
+def batch_entries(context, payloads, extra_attributes, subject):
+    attributes = {
+        'sender': {'DataType': 'String', 'StringValue': context.function_name},
+        'sender_version': {'DataType': 'String', 'StringValue': context.function_version}}
+    attributes.update(extra_attributes)
+    return [
+        {'Id': str(i), 'Message': json.dumps(payload), 'Subject': subject, 'MessageAttributes': attributes}
+        for i, payload in enumerate(payloads)]
+
+
+def test_publish_many(context, monkeypatch):
+    topic_arn, payload, extra_attributes, _, _ = params_for_publish(context, 'My Subject')
+    payloads = [dict(payload, n=i) for i in range(3)]
+    entries = batch_entries(context, payloads, extra_attributes, 'My Subject')
+    response = {'Successful': [{'Id': str(i), 'MessageId': f'id-{i}'} for i in range(3)], 'Failed': []}
+    monkeypatch.setenv('MESSAGE_BUS_ARN', topic_arn)
+    with botocore.stub.Stubber(sns.client()) as stubber:
+        expected_params = {'TopicArn': topic_arn, 'PublishBatchRequestEntries': entries}
+        stubber.add_response('publish_batch', response, expected_params)
+        assert sns.publish_many(topic_arn, context, payloads, extra_attributes, 'My Subject') == [
+            'id-0', 'id-1', 'id-2']
+        stubber.add_response('publish_batch', response, expected_params)
+        assert sns.publish_many_to_bus(context, payloads, extra_attributes, 'My Subject') == ['id-0', 'id-1', 'id-2']
+    assert sns.publish_many(topic_arn, context, []) == []
+
+
+def test_publish_many_retries_failed_entries(context, monkeypatch):
+    monkeypatch.setattr(sns.time, 'sleep', lambda seconds: None)
+    topic_arn, payload, extra_attributes, _, _ = params_for_publish(context, None)
+    payloads = [dict(payload, n=i) for i in range(3)]
+    entries = batch_entries(context, payloads, extra_attributes, f'Message from {context.function_name}')
+    failure = {'Code': 'InternalError', 'SenderFault': False}
+    rejection = {'Id': '2', 'Code': 'InvalidParameter', 'SenderFault': True}
+    with botocore.stub.Stubber(sns.client()) as stubber:
+        stubber.add_response(
+            'publish_batch',
+            {'Successful': [{'Id': '0', 'MessageId': 'id-0'}], 'Failed': [dict(failure, Id='1'), rejection]},
+            {'TopicArn': topic_arn, 'PublishBatchRequestEntries': entries})
+        stubber.add_response(
+            'publish_batch',
+            {'Successful': [{'Id': '1', 'MessageId': 'id-1'}], 'Failed': []},
+            {'TopicArn': topic_arn, 'PublishBatchRequestEntries': entries[1:2]})
+        with pytest.raises(sns.PublishError) as excinfo:
+            sns.publish_many(topic_arn, context, payloads, extra_attributes)
+        assert excinfo.value.failed == [rejection]
+        # Entries that keep failing are given up on after MAX_ATTEMPTS
+        for _ in range(sns.MAX_ATTEMPTS):
+            stubber.add_response('publish_batch', {'Successful': [], 'Failed': [dict(failure, Id='0')]})
+        with pytest.raises(sns.PublishError) as excinfo:
+            sns.publish_many(topic_arn, context, payloads[:1], extra_attributes)
+        assert excinfo.value.failed == [dict(failure, Id='0')]
+        # If a retry raises, only the entries that were being retried fail
+        stubber.add_response(
+            'publish_batch', {'Successful': [{'Id': '0', 'MessageId': 'id-0'}], 'Failed': [dict(failure, Id='1')]})
+        stubber.add_client_error('publish_batch', 'InternalError')
+        with pytest.raises(sns.PublishError) as excinfo:
+            sns.publish_many(topic_arn, context, payloads[:2], extra_attributes)
+        failed = [(failure['Id'], failure['Code']) for failure in excinfo.value.failed]
+        assert failed == [('1', 'InternalErrorException')]
+        stubber.assert_no_pending_responses()
+
+
+def test_publish_many_batch_error(context, monkeypatch):
+    error = botocore.exceptions.ClientError(
+        {'Error': {'Code': 'Throttling', 'Message': 'Rate exceeded'}}, 'PublishBatch')
+
+    class FakeClient:
+        def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+            if PublishBatchRequestEntries[0]['Id'] == '10':
+                raise error
+            entries = PublishBatchRequestEntries
+            return {'Successful': [{'Id': entry['Id'], 'MessageId': f'id-{entry["Id"]}'} for entry in entries]}
+
+    monkeypatch.setattr(sns, 'client', FakeClient)
+    payloads = [{'n': i} for i in range(25)]
+    with pytest.raises(sns.PublishError) as excinfo:
+        sns.publish_many('arn:aws:sns:us-east-1:1234567890:test-topic', context, payloads)
+    # The other batches were still published, and every message of the failed batch is reported
+    assert [failure['Id'] for failure in excinfo.value.failed] == [str(i) for i in range(10, 20)]
+    assert all(failure['Code'] == 'ClientError' and 'Rate exceeded' in failure['Message']
+               for failure in excinfo.value.failed)
+
+
+def test_publish_many_batches(context, monkeypatch):
+    batches = []
+
+    def publish_batch(topic_arn, entries):
+        batches.append(entries)
+        return ({entry['Id']: f'id-{entry["Id"]}' for entry in entries}, [])
+
+    monkeypatch.setattr(sns, '_publish_batch', publish_batch)
+    payloads = [{'n': i} for i in range(25)]
+    message_ids = sns.publish_many('arn:aws:sns:us-east-1:1234567890:test-topic', context, payloads)
+    assert message_ids == [f'id-{i}' for i in range(25)]
+    assert sorted(len(batch) for batch in batches) == [5, 10, 10]
+    # All entries share the same attributes dict
+    assert len(set(id(entry['MessageAttributes']) for batch in batches for entry in batch)) == 1
+
+
+def test_pack():
+    def entry(size):
+        return {'Message': 'x' * size, 'Subject': '', 'MessageAttributes': {}}
+
+    assert [len(batch) for batch in sns._pack(entry(10) for _ in range(21))] == [10, 10, 1]
+    big = sns.BATCH_BYTES // 3
+    assert [len(batch) for batch in sns._pack([entry(big), entry(big), entry(big), entry(big)])] == [3, 1]
+    assert [len(batch) for batch in sns._pack([entry(sns.BATCH_BYTES * 2), entry(10)])] == [1, 1]
+    assert sns._pack([]) == []
+    attributes = {'name': {'DataType': 'String', 'StringValue': 'value'}}
+    assert sns._entry_size({'Message': 'ab', 'Subject': 'c', 'MessageAttributes': attributes}) == 3 + 4 + 6 + 5
+    attributes = {'name': {'DataType': 'Binary', 'BinaryValue': b'\x00\x01'}}
+    assert sns._entry_size({'Message': 'ab', 'Subject': 'c', 'MessageAttributes': attributes}) == 3 + 4 + 6 + 2
+
+
+def test_publish_many_binary_attributes(context):
+    extra_attributes = {'blob': {'DataType': 'Binary', 'BinaryValue': b'\x00\x01'}}
+    response = {'Successful': [{'Id': '0', 'MessageId': 'id-0'}], 'Failed': []}
+    with botocore.stub.Stubber(sns.client()) as stubber:
+        stubber.add_response('publish_batch', response)
+        assert sns.publish_many('arn:aws:sns:us-east-1:123456789012:topic', context, [{}], extra_attributes) == [
+            'id-0']
+
+
+@pytest.fixture
+def background(monkeypatch):
+    batches = []
+
+    def publish_batch(topic_arn, entries):
+        batches.append((topic_arn, entries))
+        message_ids = {entry['Id']: f'{topic_arn}/{entry["Message"]}' for entry in entries if entry['Message'] != '0'}
+        failed = [{'Id': entry['Id'], 'Code': 'InternalError'} for entry in entries if entry['Message'] == '0']
+        return (message_ids, failed)
+
+    monkeypatch.setattr(sns, '_publish_batch', publish_batch)
+    sns.start_background_publishing()
+    yield batches
+    sns.stop_background_publishing(timeout=5)
+
+
+def test_background_publishing(context, background, monkeypatch):
+    monkeypatch.setenv('MESSAGE_BUS_ARN', 'bus')
+    futures = [sns.publish('topic', context, i) for i in range(1, 26)]
+    futures.append(sns.publish_to_bus(context, 1))
+    sns.flush(timeout=5)
+    assert [future.result() for future in futures] == [f'topic/{i}' for i in range(1, 26)] + ['bus/1']
+    assert sum(len(entries) for _, entries in background) == 26
+    assert all(len(entries) <= sns.BATCH_SIZE for _, entries in background)
+    assert set(topic_arn for topic_arn, _ in background) == {'topic', 'bus'}
+    sns.flush(timeout=5)
+
+
+def test_background_publishing_failures(context, background):
+    future = sns.publish('topic', context, 0)
+    sns.publish('topic', context, 1)
+    with pytest.raises(sns.PublishError) as excinfo:
+        sns.flush(timeout=5)
+    assert excinfo.value.failed == [{'Id': '0', 'Code': 'InternalError', 'TopicArn': 'topic'}]
+    assert isinstance(future.exception(), sns.PublishError)
+    # Failures are only reported once
+    sns.flush(timeout=5)
+
+
+def test_background_publishing_survives_errors(context, background, monkeypatch):
+    pack = sns._pack
+
+    def broken_pack(entries):
+        raise KeyError('StringValue')
+
+    monkeypatch.setattr(sns, '_pack', broken_pack)
+    future = sns.publish('topic', context, 1)
+    with pytest.raises(sns.PublishError) as excinfo:
+        sns.flush(timeout=5)
+    assert excinfo.value.failed[0]['Code'] == 'KeyError'
+    assert isinstance(future.exception(timeout=5), sns.PublishError)
+    # The worker is still alive, and publishes the next messages
+    monkeypatch.setattr(sns, '_pack', pack)
+    assert sns._publisher._thread.is_alive()
+    future = sns.publish('topic', context, 2)
+    sns.flush(timeout=5)
+    assert future.result() == 'topic/2'
+
+
+def test_background_publishing_missing_results(context, background, monkeypatch):
+    monkeypatch.setattr(sns, '_publish_batch', lambda topic_arn, entries: ({}, []))
+    future = sns.publish('topic', context, 1)
+    with pytest.raises(sns.PublishError):
+        sns.flush(timeout=5)
+    assert future.exception(timeout=5).failed[0]['Code'] == 'MissingResult'
+
+
+def test_flush_on_return(context, background):
+    @sns.flush_on_return
+    def handler(event, context):
+        return sns.publish('topic', context, event)
+
+    future = handler(1, context)
+    assert future.done()
+    assert future.result() == 'topic/1'
+    with pytest.raises(sns.PublishError):
+        handler(0, context)
+
+
+def test_stop_background_publishing(context, background):
+    sns.start_background_publishing()
+    publisher = sns._publisher
+    future = sns.publish('topic', context, 1)
+    sns.stop_background_publishing(timeout=5)
+    assert future.result() == 'topic/1'
+    assert sns._publisher is None
+    assert not publisher._thread.is_alive()
+    sns.flush()
+    sns.stop_background_publishing()
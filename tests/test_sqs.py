@@ -3,6 +3,7 @@ import pathlib
 import re
 
 import botocore.client
+import pytest
 
 from astromech import sqs
 
@@ -32,3 +33,160 @@ def test_parse_event():
     event = json.loads(path.read_text())
     items = [json.loads(event['Records'][0]['body']), event['Records'][1]['body']]
     assert all(i == j for i, j in zip(sqs.parse_event(event), items))
+
+
+def s3_event():
+    return {'Records': [{
+        'eventSource': 'aws:s3',
+        'eventName': 'ObjectCreated:Put',
+        's3': {'bucket': {'name': 'test-bucket'}, 'object': {'key': 'path/to/key', 'size': 1024}}}]}
+
+
+def sns_envelope(message):
+    return {
+        'Type': 'Notification',
+        'MessageId': '2013907e-de73-5f67-bccd-c57c0271179c',
+        'TopicArn': 'arn:aws:sns:us-east-1:1234567890:test-topic',
+        'Message': message,
+        'MessageAttributes': {}}
+
+
+def event_with_bodies(*bodies):
+    return {'Records': [{'messageId': str(i), 'body': body} for i, body in enumerate(bodies)]}
+
+
+def test_parse_event_unwrap():
+    payload = {'key': 'Value'}
+    event = event_with_bodies(
+        json.dumps(payload),
+        json.dumps(sns_envelope(json.dumps(payload))),
+        json.dumps(sns_envelope('Hello from SNS!')),
+        json.dumps(s3_event()),
+        json.dumps(sns_envelope(json.dumps(s3_event()))),
+        'Hello from SQS!',
+        '{"Records": [1, 2]}')
+    expected = [
+        payload, payload, 'Hello from SNS!', s3_event()['Records'], s3_event()['Records'], 'Hello from SQS!',
+        {'Records': [1, 2]}]
+    assert list(sqs.parse_event(event, unwrap=True)) == expected
+    # Without unwrapping, envelopes are returned as they are
+    assert list(sqs.parse_event(event))[1] == sns_envelope(json.dumps(payload))
+
+
+def test_parse_event_lazy(monkeypatch):
+    decoded = []
+
+    def loads(s):
+        decoded.append(s)
+        return json.loads(s)
+
+    monkeypatch.setattr(sqs.json, '_loads', loads)
+    event = event_with_bodies('{"n": 1}', '{"n": 2}', json.dumps(sns_envelope('{"n": 3}')))
+    messages = list(sqs.parse_event(event, lazy=True, unwrap=True))
+    assert all(isinstance(m, sqs.Message) for m in messages)
+    assert decoded == []
+    assert messages[1].message_id == '1'
+    assert messages[1].body == {'n': 2}
+    assert messages[1].body == {'n': 2}
+    assert decoded == ['{"n": 2}']
+    assert messages[2].body == {'n': 3}
+    assert len(decoded) == 3
+
+
+@pytest.fixture
+def claim_check_env(monkeypatch):
+    monkeypatch.setenv('CLAIM_CHECK_BUCKET', 'claims')
+    monkeypatch.delenv('CLAIM_CHECK_KEY_PREFIX', raising=False)
+    return monkeypatch
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_parse_event_claim_checks(claim_check_env, monkeypatch, lazy):
+    payloads = {'s3://claims/1.json': json.dumps({'n': 1}), 's3://claims/2.json': json.dumps({'n': 2})}
+    deleted = []
+    monkeypatch.setattr(sqs.claimcheck, 'fetch', payloads.__getitem__)
+    monkeypatch.setattr(sqs.claimcheck, 'delete', deleted.append)
+    raw = {
+        'messageId': '0', 'body': json.dumps({'claim_check': 's3://claims/1.json'}),
+        'messageAttributes': {'claim_check': {'stringValue': 's3://claims/1.json', 'dataType': 'String'}}}
+    envelope = sns_envelope(json.dumps({'claim_check': 's3://claims/2.json'}))
+    envelope['MessageAttributes'] = {'claim_check': {'Type': 'String', 'Value': 's3://claims/2.json'}}
+    wrapped = {'messageId': '1', 'body': json.dumps(envelope)}
+    plain = {'messageId': '2', 'body': '{"claim_check": "just a field"}'}
+    event = {'Records': [raw, wrapped, plain]}
+    items = sqs.parse_event(event, lazy=lazy, unwrap=True, delete_claim_checks=True)
+    first = next(items)
+    assert (first.body if lazy else first) == {'n': 1}
+    second = next(items)
+    assert (second.body if lazy else second) == {'n': 2}
+    assert deleted == []
+    rest = [m.body if lazy else m for m in items]
+    assert rest == [{'claim_check': 'just a field'}]
+    assert sorted(deleted) == sorted(payloads)
+    # Without unwrapping, the payload is put back in its SNS envelope
+    items = list(sqs.parse_event(event))
+    assert items[1]['Message'] == payloads['s3://claims/2.json']
+    # Claim-checks can be left alone
+    assert list(sqs.parse_event(event, claim_checks=False))[0] == {'claim_check': 's3://claims/1.json'}
+
+
+def test_parse_event_claim_checks_kept_on_failure(claim_check_env, monkeypatch):
+    uris = [f's3://claims/{i}.json' for i in range(3)]
+    deleted = []
+    monkeypatch.setattr(sqs.claimcheck, 'fetch', lambda uri: json.dumps({'uri': uri}))
+    monkeypatch.setattr(sqs.claimcheck, 'delete', deleted.append)
+    event = {'Records': [
+        {'messageId': str(i), 'body': '{}', 'messageAttributes': {'claim_check': {'stringValue': uri}}}
+        for i, uri in enumerate(uris)]}
+
+    def handler():
+        for item in sqs.parse_event(event, delete_claim_checks=True):
+            if item['uri'] == uris[-1]:
+                raise RuntimeError('Failed on the last record')
+
+    with pytest.raises(RuntimeError):
+        handler()
+    # SQS redelivers the whole batch, so every payload must still be there
+    assert deleted == []
+
+
+def test_parse_event_claim_checks_delete_failure(claim_check_env, monkeypatch, caplog):
+    uris = [f's3://claims/{i}.json' for i in range(3)]
+    deleted = []
+
+    def delete(uri):
+        if uri == uris[1]:
+            raise RuntimeError('Access denied')
+        deleted.append(uri)
+
+    monkeypatch.setattr(sqs.claimcheck, 'fetch', lambda uri: json.dumps({'uri': uri}))
+    monkeypatch.setattr(sqs.claimcheck, 'delete', delete)
+    event = {'Records': [
+        {'messageId': str(i), 'body': '{}', 'messageAttributes': {'claim_check': {'stringValue': uri}}}
+        for i, uri in enumerate(uris)]}
+    # The batch was processed, so the failed delete is only logged, and the other payloads are still deleted
+    assert [item['uri'] for item in sqs.parse_event(event, delete_claim_checks=True)] == uris
+    assert sorted(deleted) == [uris[0], uris[2]]
+    assert f'Could not delete claim-check {uris[1]}' in caplog.text
+
+
+@pytest.mark.parametrize('uri', ['s3://prod-secrets/db.json', 's3://claims-other/1.json', 'https://claims/1.json'])
+def test_parse_event_claim_checks_foreign(claim_check_env, monkeypatch, caplog, uri):
+    monkeypatch.setattr(sqs.claimcheck, 'fetch', pytest.fail)
+    monkeypatch.setattr(sqs.claimcheck, 'delete', pytest.fail)
+    body = json.dumps({'claim_check': uri})
+    event = {'Records': [
+        {'messageId': '0', 'body': body, 'messageAttributes': {'claim_check': {'stringValue': uri}}}]}
+    # The pointer isn't followed: the record is a regular message
+    assert list(sqs.parse_event(event, delete_claim_checks=True)) == [{'claim_check': uri}]
+    assert f'Ignoring claim-check outside of the claim-check location: {uri}' in caplog.text
+
+
+def test_parse_event_claim_checks_disabled(monkeypatch):
+    monkeypatch.delenv('CLAIM_CHECK_BUCKET', raising=False)
+    monkeypatch.setattr(sqs.claimcheck, 'fetch', pytest.fail)
+    monkeypatch.setattr(sqs.claimcheck, 'delete', pytest.fail)
+    uri = 's3://prod-secrets/db.json'
+    event = {'Records': [
+        {'messageId': '0', 'body': '{}', 'messageAttributes': {'claim_check': {'stringValue': uri}}}]}
+    assert list(sqs.parse_event(event, delete_claim_checks=True)) == [{}]
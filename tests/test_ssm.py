@@ -1,6 +1,11 @@
+import concurrent.futures
 import re
+import threading
+import time
 
 import botocore.client
+import botocore.stub
+import pytest
 
 from astromech import ssm
 
@@ -44,3 +49,129 @@ def test_get_param_value():
     with botocore.stub.Stubber(ssm.client()) as stubber:
         stubber.add_response('get_parameter', response, {'Name': param_name, 'WithDecryption': True})
         assert ssm.get_param_value(param_name, True) == 's3cret'
+
+
+@pytest.fixture
+def cache():
+    ssm.clear_cache()
+    yield
+    ssm.clear_cache()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ssm.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def parameter_response(name, value):
+    return {'Parameter': {'Name': name, 'Type': 'String', 'Value': value, 'Version': 1}}
+
+
+def test_get_param_value_cached(cache, clock):
+    expected_params = {'Name': '/My/Param', 'WithDecryption': False}
+    with botocore.stub.Stubber(ssm.client()) as stubber:
+        stubber.add_response('get_parameter', parameter_response('/My/Param', 'v1'), expected_params)
+        assert ssm.get_param_value('/My/Param', False, ttl=60) == 'v1'
+        clock[0] += 59
+        assert ssm.get_param_value('/My/Param', False, ttl=60) == 'v1'
+        stubber.assert_no_pending_responses()
+        # Expired
+        clock[0] += 1
+        stubber.add_response('get_parameter', parameter_response('/My/Param', 'v2'), expected_params)
+        assert ssm.get_param_value('/My/Param', False, ttl=60) == 'v2'
+        # Without a TTL, the cache is bypassed
+        stubber.add_response('get_parameter', parameter_response('/My/Param', 'v3'), expected_params)
+        assert ssm.get_param_value('/My/Param', False) == 'v3'
+        assert ssm.get_param_value('/My/Param', False, ttl=60) == 'v2'
+
+
+class FakeClient:
+    """Answers `get_parameter` after `release` is set, counting the calls."""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.release = threading.Event()
+
+    def get_parameter(self, Name, WithDecryption):
+        self.calls += 1
+        self.release.wait(5)
+        if isinstance(self.value, Exception):
+            raise self.value
+        return parameter_response(Name, self.value)
+
+
+def test_get_param_value_stale_while_revalidate(cache, clock, monkeypatch):
+    ssm._store(('/My/Param', True), 'old', 60)
+    fake = FakeClient('new')
+    monkeypatch.setattr(ssm, 'client', lambda: fake)
+    clock[0] += 61
+    assert ssm.get_param_value('/My/Param', True, ttl=60, stale=30) == 'old'
+    assert ssm.get_param_value('/My/Param', True, ttl=60, stale=30) == 'old'
+    fake.release.set()
+    for _ in range(100):
+        if ssm._cache[('/My/Param', True)][0] == 'new':
+            break
+        time.sleep(0.01)
+    assert ssm.get_param_value('/My/Param', True, ttl=60, stale=30) == 'new'
+    assert fake.calls == 1
+    # Past the stale window, the lookup waits for a fresh value
+    clock[0] += 100
+    assert ssm.get_param_value('/My/Param', True, ttl=60, stale=30) == 'new'
+    assert fake.calls == 2
+
+
+@pytest.mark.parametrize('value', ['s3cret', KeyError('ParameterNotFound')])
+def test_get_param_value_deduplicates(cache, monkeypatch, value):
+    fake = FakeClient(value)
+    monkeypatch.setattr(ssm, 'client', lambda: fake)
+
+    def lookup():
+        try:
+            return ssm.get_param_value('/My/Param', True, ttl=60)
+        except KeyError as e:
+            return e
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(lookup) for _ in range(5)]
+        while not ssm._loads.in_flight(('/My/Param', True)):
+            time.sleep(0.001)
+        time.sleep(0.05)
+        fake.release.set()
+        assert all(future.result() is value or future.result() == value for future in futures)
+    assert fake.calls == 1
+    assert not ssm._loads.in_flight(('/My/Param', True))
+
+
+def test_prefetch(cache, monkeypatch):
+    names = [f'/p{i}' for i in range(12)]
+    calls = []
+
+    class Client:
+        def get_parameters(self, Names, WithDecryption):
+            calls.append((Names, WithDecryption))
+            return {'Parameters': [{'Name': name, 'Value': name.upper()} for name in Names if name != '/p11']}
+
+    monkeypatch.setattr(ssm, 'client', Client)
+    values = ssm.prefetch(names + ['/p0'], True, ttl=60)
+    assert values == {name: name.upper() for name in names if name != '/p11'}
+    assert sorted(calls) == sorted([(names[:10], True), (names[10:], True)])
+    assert ssm.get_param_value('/p10', True, ttl=60) == '/P10'
+    assert len(calls) == 2
+    assert ssm.prefetch([], True, ttl=60) == {}
+
+
+def test_prefetch_path(cache):
+    with botocore.stub.Stubber(ssm.client()) as stubber:
+        stubber.add_response(
+            'get_parameters_by_path',
+            {'Parameters': [{'Name': '/app/a', 'Value': 'A'}], 'NextToken': 'token'},
+            {'Path': '/app', 'Recursive': True, 'WithDecryption': False})
+        stubber.add_response(
+            'get_parameters_by_path',
+            {'Parameters': [{'Name': '/app/b/c', 'Value': 'C'}]},
+            {'Path': '/app', 'Recursive': True, 'WithDecryption': False, 'NextToken': 'token'})
+        assert ssm.prefetch_path('/app', False, ttl=60) == {'/app/a': 'A', '/app/b/c': 'C'}
+        assert ssm.get_param_value('/app/b/c', False, ttl=60) == 'C'